@@ -15,6 +15,10 @@ class QBoardWidget(QWidget):
         self.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Expanding)
         self.setMinimumSize(500, 500)
         self.game_observer = GameObserver()
+        self.__geometry = None  # widget and board size the cached pixmaps were painted for
+        self.__grid = None
+        self.__frame = None
+        self.__drawn = {}       # square -> mark painted into __frame
         self.update_observer()
 
     def is_accept_events(self):
@@ -31,12 +35,12 @@ class QBoardWidget(QWidget):
     def squareSize(self):
         w = self.width() / self.game_observer.get_field().width * .9
         h = self.height() / self.game_observer.get_field().height * .9
-        return QSize(w, h)
+        return QSizeF(w, h)
 
     def fieldBorderSize(self):
         w = self.width() / 20
         h = self.height() / 20
-        return QSize(w, h)
+        return QSizeF(w, h)
 
     def squareBorderSize(self):
         return self.squareSize() / 10
@@ -45,43 +49,77 @@ class QBoardWidget(QWidget):
         return (math.floor((x - self.fieldBorderSize().width()) / self.squareSize().width()),
                 math.floor((y - self.fieldBorderSize().height()) / self.squareSize().height()))
 
-    def paintEvent(self, event):
-        if not self.game_observer:
-            return
+    def squareRect(self, x, y):
+        sq, border = self.squareSize(), self.fieldBorderSize()
+        return QRectF(x * sq.width() + border.width(), y * sq.height() + border.height(), sq.width(), sq.height())
 
-        painter = QPainter(self)
+    def __paintGrid(self):  # empty squares and coordinates, redone only when the geometry changes
+        field = self.game_observer.get_field()
         sq_w, sq_h = self.squareSize().width(), self.squareSize().height()
         field_border_w, field_border_h = self.fieldBorderSize().width(), self.fieldBorderSize().height()
-        sq_border_w, sq_border_h = self.squareBorderSize().width(), self.squareBorderSize().height()
 
-        for x in range(0, self.game_observer.get_field().width):
-            cx = x * sq_w + field_border_w
-            for y in range(0, self.game_observer.get_field().height):
-                cy = y * sq_h + field_border_h
-                shape = self.game_observer.get_field().piece(x, y)
-                if shape == "X":
-                    painter.drawLine(cx + sq_border_w, cy + sq_border_h,
-                                     cx + sq_w - sq_border_w, cy + sq_h - sq_border_h)
-                    painter.drawLine(cx + sq_w - sq_border_w, cy + sq_border_h,
-                                     cx + sq_border_w, cy + sq_h - sq_border_h)
-                elif shape == "O":
-                    painter.drawEllipse(cx + sq_border_w, cy + sq_border_h, sq_w * .8, sq_h * .8)
+        self.__grid = QPixmap(self.size())
+        self.__grid.fill(self.palette().color(QPalette.Window))
+        painter = QPainter(self.__grid)
+        painter.drawLines([QLineF(x * sq_w + field_border_w, field_border_h
+                                  , x * sq_w + field_border_w, field.height * sq_h + field_border_h)
+                           for x in range(0, field.width + 1)]
+                          + [QLineF(field_border_w, y * sq_h + field_border_h
+                                    , field.width * sq_w + field_border_w, y * sq_h + field_border_h)
+                             for y in range(0, field.height + 1)])
+        for i in range(0, field.width):
+            cx = i * sq_w + field_border_w
+            painter.drawText(QRectF(cx, 0, sq_w, field_border_h), Qt.AlignVCenter | Qt.AlignHCenter, str(i))
+        for i in range(0, field.height):
+            cy = i * sq_h + field_border_h
+            painter.drawText(QRectF(0, cy, field_border_w, sq_h), Qt.AlignVCenter | Qt.AlignHCenter, str(i))
+        painter.end()
 
-                else:
-                    highlight = self.game_observer.get_highlights().piece(x, y)
-                    if type(highlight) == int:
-                        painter.drawText(cx, cy, sq_w, sq_h, Qt.AlignVCenter | Qt.AlignHCenter, str(highlight))
+        self.__frame = self.__grid.copy()
+        self.__drawn = {}
 
+    def __paintSquares(self, marks):    # marks: (x, y) -> "X", "O", highlight number or None for empty
+        sq_border_w, sq_border_h = self.squareBorderSize().width(), self.squareBorderSize().height()
+        painter = QPainter(self.__frame)
+        crosses = []
+        circles = QPainterPath()
+        for (x, y), mark in marks.items():
+            rect = self.squareRect(x, y)
+            painter.drawPixmap(rect, self.__grid, rect)    # back to an empty square
+            inner = rect.adjusted(sq_border_w, sq_border_h, -sq_border_w, -sq_border_h)
+            if mark == "X":
+                crosses.append(QLineF(inner.topLeft(), inner.bottomRight()))
+                crosses.append(QLineF(inner.topRight(), inner.bottomLeft()))
+            elif mark == "O":
+                circles.addEllipse(inner)
+            elif type(mark) == int:
+                painter.drawText(rect, Qt.AlignVCenter | Qt.AlignHCenter, str(mark))
+        if crosses:
+            painter.drawLines(crosses)
+        if not circles.isEmpty():
+            painter.drawPath(circles)
+        painter.end()
+
+    def paintEvent(self, event):
+        if not self.game_observer:
+            return
 
-                painter.drawRect(cx, cy, sq_w, sq_h)
+        field = self.game_observer.get_field()
+        geometry = (self.width(), self.height(), field.width, field.height)
+        if geometry != self.__geometry:
+            self.__geometry = geometry
+            self.__paintGrid()
 
-        for i in range(0, self.game_observer.get_field().width):
-            cx = i * sq_w + field_border_w
-            painter.drawText(cx, 0, sq_w, field_border_h, Qt.AlignVCenter | Qt.AlignHCenter, str(i))
-        for i in range(0, self.game_observer.get_field().height):
-            cy = i * sq_h + field_border_h
-            painter.drawText(0, cy, field_border_w, sq_h, Qt.AlignVCenter | Qt.AlignHCenter, str(i))
+        # only squares whose mark differs from the cached frame are painted again
+        marks = self.game_observer.marks()
+        changed = {square: marks.get(square) for square in set(self.__drawn) | set(marks)
+                   if self.__drawn.get(square) != marks.get(square)}
+        if changed:
+            self.__paintSquares(changed)
+            self.__drawn = marks
 
+        painter = QPainter(self)
+        painter.drawPixmap(event.rect(), self.__frame, event.rect())
 
     def wheelEvent(self, event):
         if not self.game_observer:
@@ -136,6 +174,10 @@ class QBoardWidget(QWidget):
         if event.key() == Qt.Key_W:
             self.parent().core.engine_manager.dual_play(self.__slot_id)
             self.update()
+        if event.key() == Qt.Key_F:
+            self.parent().core.report_position(self.__slot_id)
+        if event.key() == Qt.Key_P:
+            self.parent().core.report_instrumentation(self.__slot_id)
         if event.key() == Qt.Key_S:
             self.parent().core.save_game(self.__slot_id)
             self.parent().update_game_controls()
@@ -4,13 +4,22 @@ from PyQt5.QtGui import *
 
 
 class QConsoleWidget(QWidget):
-    def __init__(self, parent=None):
+    def __init__(self, parent=None, max_blocks=5000, flush_interval=50):
         super().__init__(parent)
 
         self.input_handler = None
 
         self.text = QPlainTextEdit(self)
         self.text.setReadOnly(True)
+        self.text.setMaximumBlockCount(max_blocks)     # older lines drop off the top
+
+        # lines are collected and appended in one go, so a chatty brain costs one
+        # document update per interval instead of one per line
+        self.pending = []
+        self.flush_timer = QTimer(self)
+        self.flush_timer.setSingleShot(True)
+        self.flush_timer.setInterval(flush_interval)
+        self.flush_timer.timeout.connect(self.flush)
 
         self.input = QLineEdit(self)
         self.input.returnPressed.connect(self.onInput)
@@ -20,7 +29,18 @@ class QConsoleWidget(QWidget):
         self.layout.addWidget(self.input)
 
     def print(self, text):
-        self.text.appendPlainText(text)
+        self.pending.append(text)
+        if not self.flush_timer.isActive():
+            self.flush_timer.start()
+
+    def flush(self):
+        if self.pending:
+            self.text.appendPlainText('\n'.join(self.pending))
+            self.pending = []
+
+    def setLimits(self, max_blocks, flush_interval):
+        self.text.setMaximumBlockCount(max_blocks)
+        self.flush_timer.setInterval(flush_interval)
 
     def onInput(self):
         text = self.input.text()
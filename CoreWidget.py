@@ -51,9 +51,16 @@ class QCoreWidget(QWidget):
         self.resize_slider.setRange(1, 255)
         self.resize_slider.setTickInterval(1)
         self.resize_slider.setValue(16)
-        self.resize_slider.valueChanged.connect(lambda x: self.resize(x, x))
+        self.resize_slider.valueChanged.connect(lambda x: self.resize_timer.start())
+        self.resize_slider.sliderReleased.connect(self.apply_resize)
         self.tools_layout.addWidget(self.resize_slider)
 
+        # dragging the slider resizes once it rests, not at every value it passes
+        self.resize_timer = QTimer(self)
+        self.resize_timer.setSingleShot(True)
+        self.resize_timer.setInterval(150)
+        self.resize_timer.timeout.connect(self.apply_resize)
+
         self.setMinimumSize(1200, 800)
 
         self.show()
@@ -68,6 +75,12 @@ class QCoreWidget(QWidget):
         self.core.resize(w, h)
         self.updateBoards()
 
+    def apply_resize(self):
+        self.resize_timer.stop()
+        size = self.resize_slider.value()
+        if (size, size) != (self.core.games[0].field.width, self.core.games[0].field.height):
+            self.resize(size, size)
+
     def update_engine_controls(self):
         self.engine_controls[0].resetSelector(self.core.engine_configs.long_names(), self.core.get_engine_id(0)
                                               , lambda id: self.core.select_engine(0, id))
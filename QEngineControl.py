@@ -5,6 +5,13 @@ from PyQt5.QtGui import *
 from ConsoleWidget import QConsoleWidget
 
 
+class QEngineAdapter(QObject):
+    con_print = pyqtSignal('QString')
+
+    def forward(self, text):    # queued into the GUI thread when called from a brain reader thread
+        self.con_print.emit(text)
+
+
 class QEngineControl(QWidget):
     def __init__(self, slot_id, parent):
         super().__init__(parent)
@@ -33,11 +40,12 @@ class QEngineControl(QWidget):
         self.kill_button.clicked.connect(lambda: self.__engine.kill())
         self.controls_layout.addWidget(self.kill_button)
 
-        self.console_widget = QConsoleWidget()
+        self.console_widget = QConsoleWidget(None, *self.parent().core.get_console_limits())
         self.main_layout.addWidget(self.console_widget)
 
         self.__engine = None
-
+        self.__adapter = QEngineAdapter(self)
+        self.__adapter.con_print.connect(self.console_widget.print)
 
     def resetSelector(self, names, id, handler):
         try:
@@ -50,13 +58,14 @@ class QEngineControl(QWidget):
         self.engine_select.currentIndexChanged.connect(handler)
 
     def attachEngine(self, engine):
+        if self.__engine:
+            try:
+                self.__engine.con_print.disconnect(self.__adapter.forward)
+            except ValueError:
+                ...
         self.__engine = engine
-        try:
-            self.__engine.con_print.disconnect()
-        except TypeError:
-            ...
-        self.__engine.con_print.connect(self.console_widget.print)
-        self.console_widget.setInputHandler(lambda text: self.__engine.send_command(text))
+        self.__engine.con_print.connect(self.__adapter.forward)
+        self.console_widget.setInputHandler(lambda text: self.__engine.send_user_command(text))
 
     def selectEngine(self, id):
         self.engine_select.setCurrentIndex(id)
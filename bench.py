@@ -0,0 +1,117 @@
+#!/usr/bin/env python
+import argparse
+import time
+
+from game import *
+from games_db import Games_DB
+
+
+class LegacyField:
+    def __init__(self):
+        self.__squares = None
+        self.width = None
+        self.height = None
+
+    def new(self):
+        self.__squares = [[False for x in range(0, self.width)] for y in range(0, self.height)]
+
+    def resize(self, w, h):
+        self.width = w
+        self.height = h
+        self.new()
+
+    def valid_square(self, x, y):
+        return 0 <= x < self.width and 0 <= y < self.height
+
+    def square_count(self):
+        return self.width * self.height
+
+    def place(self, piece, x, y):
+        if self.piece(x, y):
+            raise SquareOccupied
+        self.__squares[y][x] = piece
+
+    def remove(self, x, y):
+        if not self.piece(x, y):
+            raise SquareEmpty
+        self.__squares[y][x] = False
+
+    def piece(self, x, y):
+        if not self.valid_square(x, y):
+            raise InvalidSquare
+        return self.__squares[y][x]
+
+    def trace(self, x, y, turn, dx, dy):
+        x1, y1 = x, y
+        x2, y2 = x, y
+        count = 0
+        for i in range(0, 4):
+            x1 += dx
+            y1 += dy
+            if self.valid_square(x1, y1) and self.piece(x1, y1) == turn:
+                count += 1
+            else:
+                break
+        for j in range(0, 4):
+            x2 -= dx
+            y2 -= dy
+            if self.valid_square(x2, y2) and self.piece(x2, y2) == turn:
+                count += 1
+            else:
+                break
+        return count
+
+
+class LegacyGame(Game):
+    """Game as it was before the bitboard Field, kept as the baseline."""
+    def __init__(self):
+        super().__init__()
+        self.field = LegacyField()
+
+    def make_copy(self, movecount=None):
+        result = LegacyGame()
+        result.resize(self.field.width, self.field.height)
+        for x, y, p in self.moves[0:movecount]:
+            result.move(x, y)
+        return result
+
+    def check_win(self, x, y):
+        turn = self.field.piece(x, y) or self.turn
+        for dx, dy in [(1, 0), (1, 1), (0, 1), (-1, 1)]:
+            if self.field.trace(x, y, turn, dx, dy) >= 4:
+                return True
+        return False
+
+
+def replay(game_class, sources, rounds):
+    start = time.perf_counter()
+    for i in range(0, rounds):
+        for source in sources:
+            game = game_class()
+            game.resize(source.field.width, source.field.height)
+            for x, y, p in source.moves:
+                game.move(x, y)
+            game.make_copy()
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Replay the db/ games through Game.move and make_copy')
+    parser.add_argument('--db', default='db')
+    parser.add_argument('--rounds', type=int, default=20)
+    args = parser.parse_args()
+
+    db = Games_DB(args.db)
+    sources = [db.get(id) for id in range(0, db.count())]
+    moves = sum(source.moves.count() for source in sources) * args.rounds * 2
+
+    legacy = replay(LegacyGame, sources, args.rounds)
+    current = replay(Game, sources, args.rounds)
+    print('games: %d, moves replayed: %d' % (len(sources) * args.rounds, moves))
+    print('legacy field:   %.3f s (%.0f moves/s)' % (legacy, moves / legacy))
+    print('bitboard field: %.3f s (%.0f moves/s)' % (current, moves / current))
+    print('speedup: %.2fx' % (legacy / current))
+
+
+if __name__ == '__main__':
+    main()
@@ -5,6 +5,10 @@ from CoreWidget import QCoreWidget
 from PyQt5.QtWidgets import QFileDialog, QInputDialog
 import pickle
 from games_db import Games_DB
+from engine_cache import EngineCache
+from position_index import PositionIndex
+from instrument import Instrumentation
+import reference_engine
 
 
 class XOCore():
@@ -12,11 +16,27 @@ class XOCore():
         self.loaded = False
         self.config = Config.Base("core.cfg")
 
+        self.instrumentation = None
+        self.instrumentation_path = None
+        self.init_instrumentation()
+
         self.engine_configs = None
         self.init_engine_configs()
 
+        self.engine_cache = None
+        self.init_engine_cache()
+
+        self.engine_retries = 0
+        self.engine_incident_log = None
+        self.init_engine_supervision()
+
+        self.engine_limits = {}
+        self.engine_reply_timeout = None
+        self.init_engine_limits()
+
         self.games = None
         self.games_db = Games_DB()
+        self.position_index = PositionIndex(self.games_db)
         self.init_games()
 
         self.engine_manager = EngineManager(self)
@@ -38,9 +58,63 @@ class XOCore():
     def init_engine_configs(self):
         self.engine_configs = Config.Engines("engines.cfg")
         if self.engine_configs.count() < 1:
-            self.engine_configs.add("Default", self.get_engine_path_from_user(), True)
+            path = self.get_engine_path_from_user()
+            if path:
+                self.engine_configs.add("Default", path, True)
+            else:
+                self.engine_configs.add("Reference", reference_engine.PATH)
             self.engine_configs.save()
 
+    def init_engine_cache(self):
+        if not "engine cache" in self.config:
+            self.config["engine cache"] = {"enabled": "1", "path": "engine_cache.db", "size": "100000"}
+            self.config.save()
+        settings = self.config["engine cache"]
+        if int(settings.get("enabled", "1")):
+            self.engine_cache = EngineCache(settings.get("path", "engine_cache.db")
+                                            , int(settings.get("size", "100000")))
+
+    def init_engine_supervision(self):
+        if not "engine supervision" in self.config:
+            self.config["engine supervision"] = {"retries": "2", "log": "engine_incidents.log"}
+            self.config.save()
+        settings = self.config["engine supervision"]
+        self.engine_retries = int(settings.get("retries", "2"))
+        self.engine_incident_log = settings.get("log", "") or None
+
+    def init_engine_limits(self):  # ms, 0 is no limit; a brain silent for timeout turn + reply margin seconds is restarted
+        if not "engine limits" in self.config:
+            self.config["engine limits"] = {"timeout turn": "5000", "timeout match": "0", "reply margin": "5"}
+            self.config.save()
+        settings = self.config["engine limits"]
+        timeout_turn = int(settings.get("timeout turn", "5000"))
+        timeout_match = int(settings.get("timeout match", "0"))
+        if timeout_turn:
+            self.engine_limits["timeout_turn"] = timeout_turn
+            self.engine_reply_timeout = timeout_turn / 1000 + float(settings.get("reply margin", "5"))
+        if timeout_match:
+            self.engine_limits["timeout_match"] = timeout_match
+
+    def init_instrumentation(self):
+        if not "instrumentation" in self.config:
+            self.config["instrumentation"] = {"enabled": "0", "path": "instrumentation.log"}
+            self.config.save()
+        settings = self.config["instrumentation"]
+        if int(settings.get("enabled", "0")):
+            self.instrumentation = Instrumentation()
+            self.instrumentation.install()
+            self.instrumentation_path = settings.get("path", "") or None
+
+    def report_instrumentation(self, slot_id):
+        console = self.CoreWidget.getEngineControl(slot_id).console_widget
+        if not self.instrumentation:
+            console.print('Instrumentation is off, set enabled = 1 in the [instrumentation] section of core.cfg')
+            return
+        for line in self.instrumentation.snapshot():
+            console.print(line)
+        if self.instrumentation_path:
+            self.instrumentation.dump(self.instrumentation_path)
+
     def add_user_engine(self, name):
         path = self.get_engine_path_from_user();
         if not path:
@@ -49,26 +123,47 @@ class XOCore():
         self.engine_configs.save()
 
     def load_game(self, slot_id, game_id):
-        self.games[slot_id].load(self.games_db.games[game_id]["data"])
+        self.games[slot_id].load(self.games_db.get(game_id))
 
     def save_game(self, slot_id):
         name, ok = QInputDialog.getText(self.CoreWidget, 'Save game', 'Game name:')
         if ok:
-            self.games_db.append(name, self.games[slot_id])
+            count = self.games_db.count()
+            id = self.games_db.append(name, self.games[slot_id])
+            if self.games_db.count() == count:
+                self.CoreWidget.getEngineControl(slot_id).console_widget.print(
+                    'Not saved: the same game is already stored as ' + self.games_db[id]["name"])
+
+    def report_position(self, slot_id):
+        game = self.games[slot_id]
+        found = self.position_index.games_through(game)
+        results = self.position_index.results(game)
+        lines = [str(len(found)) + ' games passed through this position: X won ' + str(results["X"])
+                 + ', O won ' + str(results["O"]) + ', draws ' + str(results["draw"])
+                 + ', unfinished ' + str(results[""])]
+        for id, ply in found[0:20]:
+            lines.append('    ' + self.games_db[id]["name"] + ' at ply ' + str(ply))
+        if len(found) > 20:
+            lines.append('    ...')
+        console = self.CoreWidget.getEngineControl(slot_id).console_widget
+        for line in lines:
+            console.print(line)
 
     def init_games(self):
         self.games = [Game(), Game()]
         self.games[0].resize(16, 16)
         self.games[1].resize(16, 16)
 
-    def reload_engines(self):
-        self.engine_manager.shutdown()
-        self.engine_manager = EngineManager(self)
-        self.connect_engines()
+    def reload_engines(self):   # restarts only brains that died or whose binary changed
         self.engine_manager.run_engines()
+        self.connect_engines()
 
     def shutdown(self):
         self.engine_manager.shutdown()
+        if self.engine_cache:
+            self.engine_cache.close()
+        if self.instrumentation and self.instrumentation_path:
+            self.instrumentation.dump(self.instrumentation_path)
 
     def connect_engines(self):
         self.CoreWidget.getEngineControl(0).attachEngine(self.engine_manager.get_controller(0))
@@ -78,8 +173,9 @@ class XOCore():
         self.games[slot_id].new()
 
     def resize(self, w, h):
-        self.games[0].resize(w, h)
-        self.games[1].resize(w, h)
+        for game in self.games:
+            if (game.field.width, game.field.height) != (w, h):
+                game.resize(w, h)
 
     def engine_slot_name(self, slot_id):
         return "engine" + str(slot_id)
@@ -102,6 +198,25 @@ class XOCore():
         except KeyError:
             return 0
 
+    def get_engine_log_file(self, slot_id):
+        try:
+            return self.config[self.engine_slot_name(slot_id)]["log file"]
+        except KeyError:
+            return ''
+
+    def get_engine_transcript(self, slot_id):  # transcript.py recording of the brain in the slot
+        try:
+            return self.config[self.engine_slot_name(slot_id)]["transcript"]
+        except KeyError:
+            return ''
+
+    def get_console_limits(self):
+        if not "console" in self.config:
+            self.config["console"] = {"max blocks": "5000", "flush interval": "50"}
+            self.config.save()
+        settings = self.config["console"]
+        return int(settings.get("max blocks", "5000")), int(settings.get("flush interval", "50"))
+
     def set_show_engine_io(self, slot_id, value):
         if not self.engine_slot_name(slot_id) in self.config:
             self.config[self.engine_slot_name(slot_id)] = {}
@@ -1,150 +1,482 @@
+import collections
 import threading
 import re
 import os
-from shutil import copy
+import time
+from shutil import copy2
 
 from BrainDaemon.main import Brain
 
-
-from PyQt5.QtCore import pyqtSignal, QObject
+import symmetry
+import reference_engine
+import transcript
 
 
 class EngineCrashed(BaseException):
     ...
 
 
-class XOLock:
+class EngineTimeout(BaseException):
+    ...
+
+
+class Callbacks:
     def __init__(self):
-        self.__lock = threading.Lock()
+        self.__callbacks = []
 
-    def locked(self):
-        can_acquire = self.__lock.acquire(False)
-        if can_acquire:
-            self.__lock.release()
-            return False
-        return True
+    def connect(self, callback):
+        self.__callbacks.append(callback)
+
+    def disconnect(self, callback=None):
+        if callback is None:
+            self.__callbacks = []
+        else:
+            self.__callbacks.remove(callback)
+
+    def emit(self, *args):
+        for callback in list(self.__callbacks):
+            callback(*args)
+
+
+class Protocol:
+    @staticmethod
+    def prompt(slot_id, info):
+        prompt = '[' + str(slot_id) + ']'
+        if 'name' in info:
+            prompt += info['name']
+            if 'version' in info:
+                prompt += ' ' + info['version']
+            if 'author' in info:
+                prompt += ' by ' + info['author']
+        return prompt
+
+    @staticmethod
+    def about(text):
+        pattern = r'\s*(\w+)\s*=\s*"([^"]+)"\s*,?\s*'
+        return dict(re.findall(pattern, text))
+
+    @staticmethod
+    def board(game, want_best_move=True):
+        text = 'board\n'
+        side_id = game.turn_id() + 1
+
+        for i in range(0, game.moves.count()):
+            move = game.moves[i]
+            text += '' + str(move[0]) + ',' + str(move[1]) + ',' + str(side_id) + '\n'
+            side_id = side_id % 2 + 1
 
-    def acquire(self):
-        self.__lock.acquire()
+        if want_best_move:
+            text += 'done'
+        else:
+            text += 'load'
+        return text
+
+    @staticmethod
+    def expects_reply(text):
+        return text.split(None, 1)[0].lower() not in ('info', 'end') if text.strip() else False
+
+    @staticmethod
+    def move(text):
+        x, y = text.split(',')
+        return int(x), int(y)
+
+    @staticmethod
+    def play(args):
+        moves = args.rstrip().split(' ')
+        return [(int(moves[i]), int(moves[i + 1])) for i in range(0, len(moves) - 1, 2)]
+
+    @staticmethod
+    def snapshot(game, own=None):   # own: the side the brain plays, None before the first move
+        return game.field.width, game.field.height, game.moves[:], own
+
+    @staticmethod
+    def unseen_moves(known, game):  # None means the brain has to be sent the whole board
+        if known is None:
+            return None
+        w, h, moves, own = known
+        if (w, h) != (game.field.width, game.field.height) \
+                or len(moves) > game.moves.count() or game.moves[0:len(moves)] != moves:
+            return None
+        return game.moves[len(moves):]
+
+    @staticmethod
+    def opponent_move(known, game):     # the one move the brain has not seen, when it is not its own
+        delta = Protocol.unseen_moves(known, game)
+        if delta is None or len(delta) != 1 or delta[0][2] == known[3]:
+            return None
+        return delta[0]
+
+
+class EngineRequest:
+    def __init__(self, text):
+        self.text = text
+        self.reply = None
+        self.abandoned = False  # timed out, the reply is dropped when it comes
+        self.sent = None        # perf_counter() times
+        self.replied = None
+        self.__done = threading.Event()
+
+    def resolve(self, reply):
+        self.reply = reply
+        self.replied = time.perf_counter()
+        self.__done.set()
+
+    def wait(self, timeout=None):
+        return self.__done.wait(timeout)
+
+
+class ResponseQueue:
+    def __init__(self):
+        self.__pending = collections.deque()
+        self.__lock = threading.Lock()
 
-    def release(self):
-        self.__lock.release()
+    def push(self, request):
+        with self.__lock:
+            self.__pending.append(request)
 
-    def wait(self):
-        self.__lock.acquire()
-        self.__lock.release()
+    def resolve(self, text):    # None means nobody was waiting for this line
+        with self.__lock:
+            if not self.__pending:
+                return None
+            request = self.__pending.popleft()
+        request.resolve(text)   # an abandoned request still takes its late reply, so live ones stay in step
+        return request
 
+    def fail_all(self):
+        with self.__lock:
+            pending = list(self.__pending)
+            self.__pending.clear()
+        for request in pending:
+            request.resolve(None)
 
-class EngineController(QObject):
-    con_print = pyqtSignal('QString')
+    def busy(self):     # requests that timed out no longer hold the controller
+        with self.__lock:
+            return any(not request.abandoned for request in self.__pending)
 
+
+class EngineController:
     def __init__(self, slot_id):
-        super().__init__()
+        self.con_print = Callbacks()    # called from the brain reader thread too
         self.__slot_id = slot_id
         self.__device = None
         self.info = None
-        self.__lock = XOLock()
+        self.__responses = ResponseQueue()
+        self.out_of_band = Callbacks()
+        self.last_text = None
+        self.last_args = None
+        self.last_command = None
+        self.last_timing = None     # seconds spent in the last think(), None for cache hits
+        self.__last_requests = []
         self.__show_engine_io = 0
-        
-    def __make_engine_prompt(self):
-        prompt = '[' + str(self.__slot_id) + ']'
-        if 'name' in self.info:
-            prompt += self.info['name']
-            if 'version' in self.info:
-                prompt += ' ' + self.info['version']
-            if 'author' in self.info:
-                prompt += ' by ' + self.info['author']
+        self.__log = None       # file every line to and from the brain is copied to
+        self.__log_lock = threading.Lock()
+        self.__transcript = None    # transcript.Recorder of the whole conversation with the brain
+        self.__cache = None
+        self.__known = None     # (width, height, moves) as the brain last saw them
+        self.__reply_timeout = None
+        self.__source = None    # (path, size, mtime) of the binary the brain was started from
+        self.__properties = None
+        self.__copy_path = None
+        self.__generation = 0   # output of brains replaced by a restart is ignored
+        self.__infos = {}       # INFO values, sent again to a restarted brain
+        self.__retries = 0
+        self.__incident_log = None
+        self.incidents = []
 
-        return prompt
+    def __make_engine_prompt(self):
+        return Protocol.prompt(self.__slot_id, self.info)
 
     def ready(self):
         return self.__device is not None \
             and self.__device.exit_code() is None
 
+    def set_retries(self, count):   # restarts of a crashed or hung brain before giving up on a request
+        self.__retries = count
+
+    def set_incident_log(self, path):
+        self.__incident_log = path
+
+    def set_slot_id(self, slot_id):
+        self.__slot_id = slot_id
+
     def set_show_engine_io(self, value):
         self.__show_engine_io = value
 
+    def set_log_file(self, path):
+        with self.__log_lock:
+            if self.__log is not None:
+                self.__log.close()
+            self.__log = open(path, 'a', buffering=1) if path else None
+
+    def __write_log(self, text):
+        with self.__log_lock:
+            if self.__log is not None:
+                self.__log.write(time.strftime('%H:%M:%S ') + text + '\n')
+
+    def set_transcript(self, path):
+        if self.__transcript is not None and self.__transcript.path == path:
+            return
+        if self.__transcript is not None:
+            self.__transcript.close()
+        self.__transcript = transcript.Recorder(path) if path else None
+
+    def set_reply_timeout(self, seconds):
+        self.__reply_timeout = seconds
+
+    def set_cache(self, cache):
+        self.__cache = cache
+
+    def identity(self):
+        if not self.info or 'name' not in self.info:
+            return None
+        return self.info['name'] + ' ' + self.info.get('version', '')
+
     def locked(self):
-        return self.__lock.locked()
+        return self.__responses.busy()
 
     def send_command(self, text):
+        replies = self.pipeline([text])
+        return replies[-1] if replies else None
+
+    def pipeline(self, texts):
+        self.__last_requests = []
         if not self.ready():
-            print('engine[' + str(self.__slot_id) + '] ERROR: device is not ready for command ' + text)
-            return
-        self.on_engine_input(text)
-        self.__lock.acquire()
-        self.__device.send_message(text)
-        self.__lock.wait()
-        code = self.__device.exit_code()
-        if code:
-            print('engine[' + str(self.__slot_id) + '] ERROR: device crashed after command ' + text)
-            raise EngineCrashed
-
-    def start(self, properties):
+            print('engine[' + str(self.__slot_id) + '] ERROR: device is not ready for commands ' + ' | '.join(texts))
+            return None
+        requests = []
+        for text in texts:
+            self.on_engine_input(text)
+            if Protocol.expects_reply(text):
+                requests.append(EngineRequest(text))
+                requests[-1].sent = time.perf_counter()
+                self.__responses.push(requests[-1])
+            self.__device.send_message(text)
+        self.__last_requests = requests
+
+        replies = []
+        for request in requests:
+            if not request.wait(self.__reply_timeout):
+                for late in requests[requests.index(request):]:
+                    late.abandoned = True
+                print('engine[' + str(self.__slot_id) + '] ERROR: no reply to command ' + request.text)
+                raise EngineTimeout
+            if request.reply is None or self.__device.exit_code():
+                print('engine[' + str(self.__slot_id) + '] ERROR: device crashed after command ' + request.text)
+                raise EngineCrashed
+            self.last_text = request.reply
+            self.last_args = request.reply.rstrip().split(' ', 1)
+            self.last_command = self.last_args[0].lower().rstrip()
+            replies.append(request.reply)
+        return replies
+
+    def send_info(self, key, value):
+        self.__infos[key] = value
+        self.send_command('INFO ' + key + ' ' + str(value))
+
+    def send_user_command(self, text):
+        self.__known = None
+        self.send_command(text)
+
+    @staticmethod
+    def source_stamp(path):
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return path, None, None
+        return path, stat.st_size, stat.st_mtime_ns
+
+    @staticmethod
+    def local_copy(path, copy_path):    # copies only when the source differs from the last copy
+        source = EngineController.source_stamp(path)
+        if source[1] is not None and source[1:] == EngineController.source_stamp(copy_path)[1:]:
+            return copy_path
+        copy2(path, copy_path + '.tmp')     # copy2 keeps the mtime the next check compares
+        try:
+            os.replace(copy_path + '.tmp', copy_path)
+        except PermissionError:     # the old copy is still running somewhere
+            os.remove(copy_path + '.tmp')
+            print('engine copy ' + copy_path + ' is in use, starting the old copy')
+        return copy_path
+
+    def stale(self, properties):    # the brain runs an older binary than the config points at
+        return self.__source != EngineController.source_stamp(properties["path"])
+
+    def start(self, properties, copy_path=None):
         self.info = {}
+        self.__known = None
+        self.__properties = properties
+        self.__copy_path = copy_path
+        self.__source = EngineController.source_stamp(properties["path"])
 
         exec_path = None
-        if properties["need_local_copy"]:
-            exec_path = "./engine" + str(self.__slot_id)
-            copy(properties["path"], exec_path)
+        device = Brain
+        if properties["path"] == reference_engine.PATH:
+            device = reference_engine.ReferenceBrain
+            exec_path = properties["path"]
+        elif transcript.is_replay(properties["path"]):
+            device = transcript.Replayer
+            exec_path = properties["path"]
+        elif str(properties.get("need_local_copy", False)).lower() in ('1', 'true', 'yes', 'on'):
+            exec_path = self.local_copy(properties["path"], copy_path or "./engine" + str(self.__slot_id))
         else:
             exec_path = properties["path"]
 
-        self.__device = Brain(exec_path
-             , on_stdout=lambda text: self.on_engine_output(text)
-             , on_stderr=lambda text: print('engine[' + str(self.__slot_id) + '] ' + text)
-             , on_shutdown=lambda code: self.on_engine_shutdown(code))
+        self.__responses.fail_all()     # nothing the old brain still owes can be answered by the new one
+        self.__generation += 1
+        generation = self.__generation
+        self.__device = device(exec_path
+             , on_stdout=lambda text: self.on_engine_output(text) if generation == self.__generation else None
+             , on_stderr=lambda text: self.on_engine_error(text) if generation == self.__generation else None
+             , on_shutdown=lambda code: self.on_engine_shutdown(code) if generation == self.__generation else None)
 
         self.call_about()
 
+    def __restart(self, reason, command, attempt):
+        incident = {"time": time.strftime('%Y-%m-%d %H:%M:%S'), "engine": self.identity(), "reason": reason
+                    , "command": command
+                    , "exit_code": self.__device.exit_code() if self.__device else None, "attempt": attempt}
+        self.incidents.append(incident)
+        text = 'engine[' + str(self.__slot_id) + '] ' + reason + ', restart ' + str(attempt) + ' of ' \
+            + str(self.__retries) + ' (' + ', '.join(key + ' ' + str(incident[key])
+                                                   for key in ("engine", "command", "exit_code")) + ')'
+        print(text)
+        self.con_print.emit(text)
+        if self.__incident_log:
+            with open(self.__incident_log, 'a') as file:
+                file.write(incident["time"] + ' ' + text + '\n')
+
+        self.kill()
+        try:
+            self.start(self.__properties, self.__copy_path)
+            for key, value in self.__infos.items():
+                self.send_command('INFO ' + key + ' ' + str(value))
+        except (EngineCrashed, EngineTimeout):
+            ...     # counts as a failed attempt, the next one restarts again
+
+    def __supervised(self, action):     # the board is sent again after a restart, so the request just repeats
+        attempt = 0
+        while True:
+            command = None  # died between requests
+            if self.ready():
+                try:
+                    return action()
+                except (EngineCrashed, EngineTimeout) as error:
+                    failure = error
+                    command = self.__last_requests[-1].text if self.__last_requests else None
+            else:
+                failure = EngineCrashed()
+            if self.__properties is None or attempt >= self.__retries:
+                if attempt:
+                    self.con_print.emit('engine[' + str(self.__slot_id) + '] gave up after ' + str(attempt) + ' restarts')
+                raise failure
+            attempt += 1
+            self.__restart('crashed' if isinstance(failure, EngineCrashed) else 'timed out', command, attempt)
+
     def shutdown(self):
         if self.__device:
+            if self.__transcript is not None:
+                self.__transcript.record(transcript.SENT, 'END')
             self.__device.shutdown()
 
     def kill(self):
         if self.__device:
+            if self.__transcript is not None:
+                self.__transcript.record(transcript.KILL, '')
             self.__device.kill()
+            self.__responses.fail_all()     # the exit may be reported later, or never once a restart follows
 
     def call_about(self):
         self.send_command('about')
-        pattern = '\s*(\w+)\s*=\s*"([^"]+)"\s*,?\s*'
-        pairs = re.findall(pattern, self.last_text)
+        pairs = Protocol.about(self.last_text)
         if len(pairs) > 0:
-            for key, value in pairs:
-                self.info[key] = value
+            self.info.update(pairs)
         elif self.last_command == 'unknown':
             ...
         else:
             ...  # TODO: raise
 
     def new_game(self, w, h):
+        self.__known = None
         self.send_command('start ' + str(w) + ' ' + str(h))
         if self.last_command == 'ok':
+            self.__known = (w, h, [], None)
             return
         elif self.last_command == 'error':
             ...   #TODO:
         else:
             ...  # TODO: what?
 
-    def think(self, game):
-        self.new_game(game.field.width, game.field.height)
-        if game.moves.count() == 0:
-            self.send_command("begin")
+    def think(self, game, use_cache=True):
+        self.__supervised(lambda: self.__think(game, use_cache))
+
+    def __think(self, game, use_cache):
+        identity = self.identity()
+        use_cache = use_cache and self.__cache is not None and identity is not None
+        if use_cache:
+            # rotated, mirrored and shifted copies of a position share one cache entry
+            key, transform = symmetry.canonical(game)
+            position_key = game.field.width, game.field.height, key
+            move = self.__cache.get(identity, position_key)
+            if move is not None:
+                x, y = transform.to_original(*move)
+                if game.can_move(x, y):
+                    if self.__show_engine_io:
+                        self.con_print.emit(self.__make_engine_prompt() + ' cached ' + str(x) + ',' + str(y))
+                    game.move(x, y)
+                    self.last_timing = None
+                    return
+
+        start = time.perf_counter()
+        move = Protocol.opponent_move(self.__known, game)
+        self.__known = None
+        if move is not None:
+            x, y, side = move
+            commands = ['turn ' + str(x) + ',' + str(y)]
+        elif game.moves.count() == 0:
+            commands = ['start ' + str(game.field.width) + ' ' + str(game.field.height), 'begin']
         else:
-            self.load_game(game)
-        x, y = self.last_command.split(',')
-        game.move(int(x), int(y))
+            commands = ['start ' + str(game.field.width) + ' ' + str(game.field.height), Protocol.board(game)]
+        serialised = time.perf_counter()
+        self.pipeline(commands)
+        self.__measure(serialised - start)
+        x, y = Protocol.move(self.last_command)
+        if use_cache:
+            self.__cache.put(identity, position_key, *transform.to_canonical(x, y))
+        game.move(x, y)
+        self.__known = Protocol.snapshot(game, game.moves[-1][2])
+
+    def __measure(self, serialise):
+        requests = self.__last_requests
+        if not requests or requests[-1].replied is None:
+            self.last_timing = None
+            return
+        first, last = requests[0], requests[-1]
+        # the brain starts on the move request once it is sent and everything before it is answered
+        think_start = max(last.sent, requests[-2].replied) if len(requests) > 1 else last.sent
+        self.last_timing = {"serialise": serialise,
+                            "round_trip": last.replied - first.sent,
+                            "think": last.replied - think_start}
+
+    def sync(self, game):
+        if Protocol.unseen_moves(self.__known, game) == []:
+            return
+        if game.moves.count() == 0:
+            self.new_game(game.field.width, game.field.height)
+            return
+        self.__known = None
+        self.pipeline(['start ' + str(game.field.width) + ' ' + str(game.field.height), Protocol.board(game, False)])
+        self.__known = Protocol.snapshot(game, game.turn)     # board gives the brain the side to move
 
     def play(self, game):
-        self.new_game(game.field.width, game.field.height)
-        self.load_game(game, False)
+        self.__supervised(lambda: self.__play(game))
+
+    def __play(self, game):
+        self.sync(game)
+        self.__known = None
         self.send_command('single_play')
 
         if self.last_command == 'play' and len(self.last_args) > 1:
-            moves = self.last_args[1].rstrip().split(' ')
-            while len(moves) > 0:
-                x = int(moves.pop(0))
-                y = int(moves.pop(0))
+            for x, y in Protocol.play(self.last_args[1]):
                 try:
                     game.move(x, y)
                 except:
@@ -155,29 +487,18 @@ class EngineController(QObject):
             ...  # ???
         return
 
-    def load_game(self, game, want_best_move=True):
-        if game.moves.count() == 0:
-            return
-        text = 'board\n'
-        side_id = game.turn_id() + 1
-
-        for i in range(0, game.moves.count()):
-            move = game.moves[i]
-            text += '' + str(move[0]) + ',' + str(move[1]) + ',' + str(side_id) + '\n'
-            side_id = side_id % 2 + 1
-
-        if want_best_move:
-            text += 'done'
-        else:
-            text += 'load'
-        self.send_command(text)
-
     def print_square_info(self, game, x, y):
-        self.new_game(game.field.width, game.field.height)
-        self.load_game(game, False)
+        self.__supervised(lambda: self.__print_square_info(game, x, y))
+
+    def __print_square_info(self, game, x, y):
+        self.sync(game)
         self.send_command("squareinfo " + str(x) + " " + str(y))
 
     def on_engine_input(self, text):
+        if self.__transcript is not None:
+            self.__transcript.record(transcript.SENT, text)
+        if self.__log is not None:
+            self.__write_log('<<< ' + text)
         if self.__show_engine_io:
             output_text = self.__make_engine_prompt()
             output_text += ' <<< '
@@ -187,17 +508,27 @@ class EngineController(QObject):
     def on_engine_message(self, message):
         self.con_print.emit(self.__make_engine_prompt() + ': ' + message)
 
-    def on_engine_output(self, text):
-        self.last_text = text
-        self.last_args = text.rstrip().split(' ', 1)
-        self.last_command = self.last_args[0].lower().rstrip()
+    def on_engine_out_of_band(self, text):
+        self.con_print.emit(self.__make_engine_prompt() + ' >>> (unsolicited) ' + text)
+        self.out_of_band.emit(text)
 
-        if self.last_command == 'message':
+    def on_engine_output(self, text):
+        if self.__transcript is not None:
+            self.__transcript.record(transcript.RECEIVED, text)
+        if self.__log is not None:
+            self.__write_log('>>> ' + text)
+        args = text.rstrip().split(' ', 1)
+        command = args[0].lower().rstrip()
+
+        if command == 'message':
             msg = ''
-            if len(self.last_args) > 1:
-                msg += self.last_args[1]
+            if len(args) > 1:
+                msg += args[1]
                 self.on_engine_message(msg)
             return
+        if command == 'debug':
+            self.out_of_band.emit(text)
+            return
 
         output_text = self.__make_engine_prompt()
 
@@ -205,17 +536,20 @@ class EngineController(QObject):
             output_text += ' >>> ' + text
             self.con_print.emit(output_text)
 
-        if self.__lock.locked():
-            self.__lock.release()
-            return
+        if self.__responses.resolve(text) is None:
+            self.on_engine_out_of_band(text)
 
-        else:
-            ... #TODO: what is it
+    def on_engine_error(self, text):
+        if self.__transcript is not None:
+            self.__transcript.record(transcript.ERROR, text)
+        print('engine[' + str(self.__slot_id) + '] ' + text)
 
     def on_engine_shutdown(self, code):
+        if self.__transcript is not None:
+            self.__transcript.record(transcript.EXIT, str(code))
+        self.__known = None
         print('engine[' + str(self.__slot_id) + '] finished with exit code ' + str(code))
-        if code != 0 and self.__lock.locked():
-            self.__lock.release()
+        self.__responses.fail_all()
 
 
 
@@ -275,9 +609,22 @@ class EngineBinding:
             self.__bind0 = EngineBinding.SingleEngine(engine0, game0)
             self.__bind1 = EngineBinding.SingleEngine(engine1, game1)
 
-        def think(self):
-            self.__bind0.think()
-            self.__bind1.think()
+        def think(self):    # each brain waits on its own replies, so the boards run side by side
+            errors = []
+
+            def think_one(bind):
+                try:
+                    bind.think()
+                except BaseException as error:  # raised again on the calling thread, as a single think would
+                    errors.append(error)
+
+            threads = [threading.Thread(target=think_one, args=(bind,)) for bind in (self.__bind0, self.__bind1)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            if errors:
+                raise errors[0]
 
         def play(self):
             self.__bind0.play()
@@ -287,10 +634,44 @@ class EngineBinding:
             return self.__bind0.ready() and self.__bind1.ready()
 
 
+class EnginePool:   # idle running brains by engines.cfg id, handed out again instead of starting new ones
+    def __init__(self, max_idle=4):
+        self.__idle = []    # (engine id, controller), oldest first
+        self.__max_idle = max_idle
+
+    def acquire(self, engine_id, properties):   # a warm controller or None
+        for item in [item for item in self.__idle if item[0] == engine_id]:
+            self.__idle.remove(item)
+            engine = item[1]
+            if engine.ready() and not engine.stale(properties):
+                return engine
+            self.__stop(engine)
+        return None
+
+    def release(self, engine_id, engine):
+        if not engine.ready():
+            return
+        self.__idle.append((engine_id, engine))
+        while len(self.__idle) > self.__max_idle:
+            self.__stop(self.__idle.pop(0)[1])
+
+    def shutdown(self):
+        for engine_id, engine in self.__idle:
+            self.__stop(engine)
+        self.__idle = []
+
+    @staticmethod
+    def __stop(engine):
+        if engine.ready():
+            engine.shutdown()
+
+
 class EngineManager:
     def __init__(self, core):
         self.__core = core
         self.__engines = [EngineController(0), EngineController(1)]
+        self.__engine_ids = [None, None]
+        self.__pool = EnginePool()
 
     def get_engine_properties(self, id):
         return self.__core.engine_configs[id]
@@ -298,31 +679,64 @@ class EngineManager:
     def get_controller(self, slot_id):
         return self.__engines[slot_id]
 
+    def __detach(self, slot_id):     # a running brain goes to the pool, the slot gets an empty controller
+        if self.__engine_ids[slot_id] is not None:
+            self.__engines[slot_id].set_log_file(None)   # the transcript stays with the brain it records
+            self.__pool.release(self.__engine_ids[slot_id], self.__engines[slot_id])
+            self.__engines[slot_id] = EngineController(slot_id)
+            self.__engine_ids[slot_id] = None
+
     def __run_engine(self, slot_id, engine_id): #TODO FIX: добавляет в неизвестный индекс
-        self.__engines[slot_id].set_show_engine_io(self.__core.get_show_engine_io(slot_id))
+        properties = self.get_engine_properties(engine_id)
+        engine = self.__engines[slot_id]
+        if self.__engine_ids[slot_id] == engine_id and engine.ready() and engine.stale(properties):
+            engine.shutdown()
+            self.__engine_ids[slot_id] = None
+            engine = self.__engines[slot_id] = EngineController(slot_id)
+        if self.__engine_ids[slot_id] != engine_id:
+            self.__detach(slot_id)
+            engine = self.__engines[slot_id] = self.__pool.acquire(engine_id, properties) or self.__engines[slot_id]
+            self.__engine_ids[slot_id] = engine_id
+        engine.set_slot_id(slot_id)
+        engine.set_show_engine_io(self.__core.get_show_engine_io(slot_id))
+        engine.set_log_file(self.__core.get_engine_log_file(slot_id))
+        if not engine.ready():  # a recording starts with the brain, a pooled one keeps its own
+            engine.set_transcript(self.__core.get_engine_transcript(slot_id))
+        engine.set_cache(self.__core.engine_cache)
+        engine.set_retries(self.__core.engine_retries)
+        engine.set_incident_log(self.__core.engine_incident_log)
+        engine.set_reply_timeout(self.__core.engine_reply_timeout)
+        if engine.ready():
+            return
         try:
-            self.__engines[slot_id].start(self.get_engine_properties(engine_id))
-        except EngineCrashed:
+            engine.start(properties, "./engine_" + str(engine_id))
+            for key, value in self.__core.engine_limits.items():
+                engine.send_info(key, value)
+        except (EngineCrashed, EngineTimeout):
             ...
 
-    def run_engines(self):
+    def run_engines(self):  # running brains are kept, so swapping the slots only trades controllers
+        wanted = [self.__core.get_engine_id(0), self.__core.get_engine_id(1)]
+        for slot_id in (0, 1):
+            if self.__engine_ids[slot_id] != wanted[slot_id]:
+                self.__detach(slot_id)
         try:
-            self.__run_engine(0, self.__core.get_engine_id(0))
-            self.__run_engine(1, self.__core.get_engine_id(1))
-        except EngineCrashed:
+            self.__run_engine(0, wanted[0])
+            self.__run_engine(1, wanted[1])
+        except (EngineCrashed, EngineTimeout):
             ...
 
     def shutdown(self):
         for engine in self.__engines:
             if engine.ready():
                 engine.shutdown()
+        self.__pool.shutdown()
 
     def single_play(self, slot_id):
         delegate = EngineBinding.SingleEngine(self.__engines[slot_id], self.__core.games[slot_id])
         try:
-            if delegate.ready():
-                delegate.play()
-        except EngineCrashed:
+            delegate.play()
+        except (EngineCrashed, EngineTimeout):
             ...
 
     def dual_play(self, slot_id):
@@ -334,9 +748,8 @@ class EngineManager:
             assert(False)
 
         try:
-            if delegate.ready():
-                delegate.think()
-        except EngineCrashed:
+            delegate.think()
+        except (EngineCrashed, EngineTimeout):
             ...
 
     def think(self, slot_id=None):
@@ -346,9 +759,8 @@ class EngineManager:
         else:
             delegate = EngineBinding.SingleEngine(self.__engines[slot_id], self.__core.games[slot_id])
         try:
-            if delegate.ready():
-                delegate.think()
-        except EngineCrashed:
+            delegate.think()
+        except (EngineCrashed, EngineTimeout):
             ...
 
     def is_locked(self):
@@ -359,7 +771,6 @@ class EngineManager:
 
     def print_square_info(self, slot_id, game, x, y):
         try:
-            if self.__engines[slot_id].ready():
-                self.__engines[slot_id].print_square_info(game, x, y)
-        except EngineCrashed:
+            self.__engines[slot_id].print_square_info(game, x, y)
+        except (EngineCrashed, EngineTimeout):
             ...
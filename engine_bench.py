@@ -0,0 +1,164 @@
+#!/usr/bin/env python
+import argparse
+import contextlib
+import json
+import math
+import os
+import sys
+import time
+
+from config import Config
+from engine import EngineController, EngineCrashed, EngineTimeout
+from game import *
+from games_db import Games_DB
+import transcript
+
+
+METRICS = ("wall", "serialise", "round_trip", "think")
+
+
+def load_corpus(dir, prefix, step, limit):    # [(game name, ply, moves)]
+    corpus = []
+    db = Games_DB(dir)
+    for id, record in enumerate(db):
+        if not record["name"].startswith(prefix):
+            continue
+        game = db.get(id)
+        if game is None:
+            continue
+        for ply in range(step, game.moves.count() + 1, step):
+            position = game.make_copy(ply)
+            if not position.is_over():
+                corpus.append((record["name"], ply, position))
+            if limit and len(corpus) >= limit:
+                return corpus
+    return corpus
+
+
+def percentile(values, p):     # nearest rank
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(len(values) - 1, max(0, math.ceil(p / 100 * len(values)) - 1))]
+
+
+def describe(values):
+    if not values:
+        return None
+    return {"p50": percentile(values, 50), "p95": percentile(values, 95), "p99": percentile(values, 99)
+            , "mean": sum(values) / len(values), "max": max(values)}
+
+
+def run(properties, corpus, args, transcript_path=None):
+    engine = EngineController(0)
+    engine.set_reply_timeout(args.reply_timeout)
+    engine.set_transcript(transcript_path)
+
+    def start_engine():     # a restarted brain needs the time limit again
+        engine.start(dict(properties, need_local_copy=False))
+        if args.timeout_turn:
+            engine.send_info('timeout_turn', args.timeout_turn)
+
+    start_engine()
+
+    samples = {metric: [] for metric in METRICS}
+    moves = []
+    errors = 0
+    start = time.perf_counter()
+    try:
+        for name, ply, position in corpus:
+            game = position.make_copy()
+            before = time.perf_counter()
+            try:
+                if not engine.ready():
+                    raise EngineCrashed
+                engine.think(game, use_cache=False)
+            except (EngineCrashed, EngineTimeout, ValueError, SquareOccupied, InvalidSquare):
+                errors += 1
+                moves.append(None)
+                if not engine.ready():
+                    start_engine()
+                continue
+            samples["wall"].append(time.perf_counter() - before)
+            for metric, value in (engine.last_timing or {}).items():
+                samples[metric].append(value)
+            x, y, side = game.moves[-1]
+            moves.append((x, y))
+    finally:
+        if engine.ready():
+            engine.kill()
+        engine.set_transcript(None)
+    elapsed = time.perf_counter() - start
+
+    answered = len(samples["wall"])
+    result = {"name": properties["name"], "path": properties["path"], "positions": len(corpus)
+              , "answered": answered, "errors": errors, "elapsed": elapsed
+              , "moves_per_s": answered / elapsed if elapsed else None}
+    for metric in METRICS:
+        result[metric] = describe(samples[metric])
+    return result, moves
+
+
+def compare(base, other, base_moves, other_moves):
+    both = [(a, b) for a, b in zip(base_moves, other_moves) if a is not None and b is not None]
+    comparison = {"base": base["name"], "other": other["name"], "positions": len(both)
+                  , "same_move": sum(1 for a, b in both if a == b) / len(both) if both else None}
+    for metric in ("wall", "think"):
+        if base[metric] and other[metric]:
+            for p in ("p50", "p95", "p99"):
+                if base[metric][p]:
+                    comparison[metric + "_" + p + "_ratio"] = other[metric][p] / base[metric][p]
+    return comparison
+
+
+def format_result(result):
+    line = '%-20s %d/%d positions, %.1f moves/s' % (result["name"], result["answered"], result["positions"]
+                                                   , result["moves_per_s"] or 0)
+    for metric in METRICS:
+        if result[metric]:
+            line += '\n    %-10s p50 %8.2f ms  p95 %8.2f ms  p99 %8.2f ms' % (
+                metric, 1000 * result[metric]["p50"], 1000 * result[metric]["p95"], 1000 * result[metric]["p99"])
+    return line
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Measure engine move latency over positions from the games database')
+    parser.add_argument('engines', type=int, nargs='+'
+                        , help='engine ids from the engines config, the first one is the base for comparisons')
+    parser.add_argument('--config', default='engines.cfg')
+    parser.add_argument('--db', default='db')
+    parser.add_argument('--prefix', default='', help='only games whose names start with this')
+    parser.add_argument('--step', type=int, default=4, help='take a position every this many plies')
+    parser.add_argument('--limit', type=int, default=0, help='at most this many positions')
+    parser.add_argument('--timeout-turn', type=int, default=1000, help='INFO timeout_turn sent to engines, ms')
+    parser.add_argument('--reply-timeout', type=float, default=30)
+    parser.add_argument('--record', metavar='DIR'
+                        , help='write each engine session to DIR/<id>' + transcript.EXTENSION
+                        + ', replay it with the engines.cfg path ' + transcript.REPLAY_FAST + '<file>')
+    parser.add_argument('--output', help='write the JSON report here instead of stdout')
+    args = parser.parse_args()
+
+    configs = Config.Engines(args.config)
+    corpus = load_corpus(args.db, args.prefix, args.step, args.limit)
+    report = {"time": time.strftime('%Y-%m-%dT%H:%M:%S'), "positions": len(corpus)
+              , "timeout_turn": args.timeout_turn, "engines": [], "comparisons": []}
+    all_moves = []
+    with contextlib.redirect_stdout(sys.stderr):   # stdout is kept for the JSON report, engines print diagnostics
+        for id in args.engines:
+            transcript_path = os.path.join(args.record, str(id) + transcript.EXTENSION) if args.record else None
+            result, moves = run(dict(configs[id]), corpus, args, transcript_path)
+            report["engines"].append(result)
+            all_moves.append(moves)
+            print(format_result(result))
+    for i in range(1, len(args.engines)):
+        report["comparisons"].append(compare(report["engines"][0], report["engines"][i], all_moves[0], all_moves[i]))
+
+    if args.output:
+        with open(args.output, 'w') as file:
+            json.dump(report, file, indent=1)
+    else:
+        print(json.dumps(report, indent=1))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,66 @@
+import sqlite3
+import threading
+
+
+class EngineCache:
+    def __init__(self, path='engine_cache.db', size=100000):
+        self.path = path
+        self.size = size
+        self.__lock = threading.Lock()
+        self.__db = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self.__db.execute('CREATE TABLE IF NOT EXISTS answers ('
+                          'engine TEXT, width INTEGER, height INTEGER, hash INTEGER, '
+                          'x INTEGER, y INTEGER, used INTEGER, '
+                          'PRIMARY KEY (engine, width, height, hash))')
+        self.__db.execute('CREATE INDEX IF NOT EXISTS answers_used ON answers (used)')
+        self.__db.commit()
+        self.__clock = self.__db.execute('SELECT COALESCE(MAX(used), 0) FROM answers').fetchone()[0]
+
+    def __key(self, engine, position_key):
+        w, h, hash = position_key
+        if hash >= 1 << 63:     # sqlite integers are signed 64-bit
+            hash -= 1 << 64
+        return engine, w, h, hash
+
+    def __tick(self):
+        self.__clock += 1
+        return self.__clock
+
+    def get(self, engine, position_key):
+        key = self.__key(engine, position_key)
+        with self.__lock:
+            row = self.__db.execute('SELECT x, y FROM answers WHERE engine=? AND width=? AND height=? AND hash=?'
+                                    , key).fetchone()
+            if row is None:
+                return None
+            self.__db.execute('UPDATE answers SET used=? WHERE engine=? AND width=? AND height=? AND hash=?'
+                              , (self.__tick(),) + key)
+            self.__db.commit()
+        return row
+
+    def put(self, engine, position_key, x, y):
+        key = self.__key(engine, position_key)
+        with self.__lock:
+            self.__db.execute('INSERT OR REPLACE INTO answers VALUES (?, ?, ?, ?, ?, ?, ?)'
+                              , key + (x, y, self.__tick()))
+            self.__evict()
+            self.__db.commit()
+
+    def __evict(self):
+        count = self.__db.execute('SELECT COUNT(*) FROM answers').fetchone()[0]
+        if count > self.size:
+            self.__db.execute('DELETE FROM answers WHERE rowid IN '
+                              '(SELECT rowid FROM answers ORDER BY used LIMIT ?)', (count - self.size,))
+
+    def count(self):
+        with self.__lock:
+            return self.__db.execute('SELECT COUNT(*) FROM answers').fetchone()[0]
+
+    def clear(self):
+        with self.__lock:
+            self.__db.execute('DELETE FROM answers')
+            self.__db.commit()
+
+    def close(self):
+        with self.__lock:
+            self.__db.close()
@@ -15,20 +15,64 @@ class EmptyMovelist(BaseException):
     ...
 
 
+class Zobrist:
+    __keys = {}
+
+    @classmethod
+    def key(cls, x, y, side):
+        seed = (x << 9 | y) << 1 | (side == "O")
+        if seed in cls.__keys:
+            return cls.__keys[seed]
+        # splitmix64: the same square always gets the same key, so hashes stay
+        # valid across processes and on disk
+        z = (seed * 0x9E3779B97F4A7C15 + 0x9E3779B97F4A7C15) & 0xFFFFFFFFFFFFFFFF
+        z = ((z ^ (z >> 30)) * 0xBF58476D1CE4E5B9) & 0xFFFFFFFFFFFFFFFF
+        z = ((z ^ (z >> 27)) * 0x94D049BB133111EB) & 0xFFFFFFFFFFFFFFFF
+        z ^= z >> 31
+        cls.__keys[seed] = z
+        return z
+
+
 class Field:
     def __init__(self):
         self.__squares = None
+        self.__bits = None
         self.width = None
         self.height = None
 
     def new(self):
-        self.__squares = [[False for x in range(0, self.width)] for y in range(0, self.height)]
+        self.__squares = [False] * (self.width * self.height)
+        self.__bits = {}
 
     def resize(self, w, h):
         self.width = w
         self.height = h
+        # bitboard rows are one bit wider than the board: the spare zero column
+        # stops horizontal and diagonal shifts from wrapping onto the next row
+        self.__stride = w + 1
+        self.__shifts = (1, self.__stride, self.__stride + 1, self.__stride - 1)
+        self.__windows = {s: sum(1 << (k * s) for k in range(0, 5)) for s in self.__shifts}
+        self.__band_mask = (1 << (9 * self.__stride)) - 1
         self.new()
 
+    def __getstate__(self):
+        squares = None
+        if self.__squares is not None:
+            squares = [self.__squares[y * self.width: (y + 1) * self.width] for y in range(0, self.height)]
+        return {"_Field__squares": squares, "width": self.width, "height": self.height}
+
+    def __setstate__(self, state):
+        self.__init__()
+        if state["width"] is None:
+            return
+        self.resize(state["width"], state["height"])
+        if state["_Field__squares"] is None:
+            return
+        for y, row in enumerate(state["_Field__squares"]):
+            for x, piece in enumerate(row):
+                if piece:
+                    self.place(piece, x, y)
+
     def valid_square(self, x, y):
         return 0 <= x < self.width and 0 <= y < self.height
 
@@ -38,38 +82,58 @@ class Field:
     def place(self, piece, x, y):
         if self.piece(x, y):
             raise SquareOccupied
-        self.__squares[y][x] = piece
+        self.__squares[y * self.width + x] = piece
+        self.__bits[piece] = self.__bits.get(piece, 0) | (1 << (y * self.__stride + x))
 
     def remove(self, x, y):
-        if not self.piece(x, y):
+        piece = self.piece(x, y)
+        if not piece:
             raise SquareEmpty
-        self.__squares[y][x] = False
+        self.__squares[y * self.width + x] = False
+        self.__bits[piece] &= ~(1 << (y * self.__stride + x))
 
     def piece(self, x, y):
-        if not self.valid_square(x, y):
+        if not (0 <= x < self.width and 0 <= y < self.height):
             raise InvalidSquare
-        return self.__squares[y][x]
+        return self.__squares[y * self.width + x]
+
+    def bits(self, piece):
+        return self.__bits.get(piece, 0)
+
+    def bit_stride(self):   # bit (y * stride + x) of bits() is square x, y
+        return self.__stride
 
     def trace(self, x, y, turn, dx, dy):
-        x1, y1 = x, y
-        x2, y2 = x, y
+        squares, w, h = self.__squares, self.width, self.height
         count = 0
-        for i in range(0, 4):
-            x1 += dx
-            y1 += dy
-            if self.valid_square(x1, y1) and self.piece(x1, y1) == turn:
-                count += 1
-            else:
-                break
-        for j in range(0, 4):
-            x2 -= dx
-            y2 -= dy
-            if self.valid_square(x2, y2) and self.piece(x2, y2) == turn:
+        for sign in (1, -1):
+            x1, y1 = x + sign * dx, y + sign * dy
+            for i in range(0, 4):
+                if not (0 <= x1 < w and 0 <= y1 < h) or squares[y1 * w + x1] != turn:
+                    break
                 count += 1
-            else:
-                break
+                x1 += sign * dx
+                y1 += sign * dy
         return count
 
+    def five(self, piece, x, y):
+        # only the 9 rows around (x, y) can hold a line through it
+        row0 = max(0, y - 4)
+        p = (y - row0) * self.__stride + x
+        b = ((self.__bits.get(piece, 0) >> (row0 * self.__stride)) & self.__band_mask) | (1 << p)
+        for s in self.__shifts:
+            starts = b & (b >> s)
+            starts &= starts >> (2 * s)
+            starts &= b >> (4 * s)
+            low = p - 4 * s
+            if low >= 0:
+                starts >>= low
+            else:
+                starts <<= -low
+            if starts & self.__windows[s]:
+                return True
+        return False
+
 
 class MoveList:
     def __init__(self):
@@ -100,18 +164,39 @@ class Game:
         self.moves = False
         self.turn = False
         self.gameover = False
+        self.hash = 0
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        if "hash" not in state:
+            self.hash = 0
+            for x, y, side in self.moves:
+                self.hash ^= Zobrist.key(x, y, side)
 
     def new(self):
         self.field.new()
         self.moves = MoveList()
         self.turn = "X"
         self.gameover = False
+        self.hash = 0
 
-    def resize(self, w, h):
+    def resize(self, w, h):     # keeps the moves before the first one that is off the new board
+        kept = []
+        for x, y, side in self.moves or []:
+            if not (0 <= x < w and 0 <= y < h):
+                break
+            kept.append((x, y))
         self.field.resize(w, h)
         self.moves = MoveList()
         self.turn = "X"
         self.gameover = False
+        self.hash = 0
+        for x, y in kept:
+            self.move(x, y)
+
+    def position_key(self):
+        # side to move follows from the piece count, so it needs no key of its own
+        return self.field.width, self.field.height, self.hash
 
     def make_copy(self, movecount=None):
         result = Game()
@@ -126,6 +211,7 @@ class Game:
         return result
 
     def load(self, other_game):
+        self.moves = MoveList()
         self.resize(other_game.field.width, other_game.field.height)
         for x, y, p in other_game.moves:
             self.move(x, y)
@@ -148,14 +234,19 @@ class Game:
 
     def check_win(self, x, y):
         turn = self.field.piece(x, y) or self.turn
-        for dx, dy in [(1, 0), (1, 1), (0, 1), (-1, 1)]:
-            if self.field.trace(x, y, turn, dx, dy) >= 4:
-                return True
-        return False
+        return self.field.five(turn, x, y)
 
     def is_over(self):
         return self.gameover
 
+    def winner(self):
+        if not self.gameover or self.moves.count() == 0:
+            return None
+        x, y, side = self.moves[-1]
+        if self.check_win(x, y):
+            return side
+        return None
+
     def can_move(self, x, y):
         return self.field.valid_square(x, y) and not self.field.piece(x, y) and not self.is_over()
 
@@ -165,6 +256,7 @@ class Game:
     def move(self, x, y):
         self.field.place(self.turn, x, y)
         self.moves.append(x, y, self.turn)
+        self.hash ^= Zobrist.key(x, y, self.turn)
         self.swap_turn()
         if self.check_win(x, y) or self.moves.count() >= self.field.square_count():
             self.gameover = True
@@ -175,6 +267,7 @@ class Game:
         self.swap_turn()
         x, y, side = self.moves.pop()
         self.field.remove(x, y)
+        self.hash ^= Zobrist.key(x, y, side)
         self.gameover = False
 
         return x, y, side
@@ -184,42 +277,65 @@ class GameObserver():
     def __init__(self):
         self.game = None
         self.__tmp_game = None
-        self.__highlights = None
+        self.__highlights = None    # move number in the game of each highlighted square
+        self.__highlighted = {}     # the same, (x, y) -> move number
 
     def bind(self, game):
         self.game = game
 
-    def reset(self):
-        self.__tmp_game = self.game.make_copy()
-        self.__highlights = Field()
-        self.__highlights.resize(self.game.field.width, self.game.field.height)
+    def reset(self):    # back to the game's position, replaying only the moves that differ
+        game, tmp = self.game, self.__tmp_game
+        if tmp is None or (tmp.field.width, tmp.field.height) != (game.field.width, game.field.height):
+            self.__tmp_game = game.make_copy()
+            self.__highlights = Field()
+            self.__highlights.resize(game.field.width, game.field.height)
+            self.__highlighted = {}
+            return
+        known = tmp.moves[:]
+        same = min(len(known), game.moves.count())
+        if game.moves[0:same] != known[0:same]:
+            same = 0
+            while known[same] == game.moves[same]:
+                same += 1
+        while tmp.moves.count() > same:
+            tmp.takeback()
+        for x, y, p in game.moves[same:]:
+            tmp.move(x, y)
+        self.clear_highlights()
 
     def clear_highlights(self):
-        self.__highlights.new()
+        for x, y in self.__highlighted:
+            self.__highlights.remove(x, y)
+        self.__highlighted = {}
 
-    def highlight_movelist(self, list):
-        i = 1
-        for x, y, p in list:
-            self.__highlights.place(i, x, y)
-            i += 1
-
-    def highlight_remaining_moves(self):
-        self.clear_highlights()
-        self.highlight_movelist(self.game.moves[self.__tmp_game.moves.count(): self.game.moves.count()])
+    def __highlight(self, x, y, number):
+        self.__highlights.place(number, x, y)
+        self.__highlighted[(x, y)] = number
 
     def forward(self):
-        if self.__tmp_game.moves.count() < self.game.moves.count():
-            x, y, p = self.game.moves[self.__tmp_game.moves.count()]
+        ply = self.__tmp_game.moves.count()
+        if ply < self.game.moves.count():
+            x, y, p = self.game.moves[ply]
+            if (x, y) in self.__highlighted:
+                self.__highlights.remove(x, y)
+                del self.__highlighted[(x, y)]
             self.__tmp_game.move(x, y)
-        self.highlight_remaining_moves()
 
     def backward(self):
-        if self.__tmp_game.moves.count() > 0:
-            self.__tmp_game.takeback()
-        self.highlight_remaining_moves()
+        ply = self.__tmp_game.moves.count()
+        if ply > 0:
+            x, y, p = self.__tmp_game.takeback()
+            self.__highlight(x, y, ply)
 
     def get_field(self):
         return self.__tmp_game.field
 
-    def get_highlights(self):
+    def get_highlights(self):   # move numbers in the game; marks() shows them relative to the shown position
         return self.__highlights
+
+    def marks(self):    # (x, y) -> piece or highlight number, only for squares that show something
+        marks = {(x, y): p for x, y, p in self.__tmp_game.moves}
+        ply = self.__tmp_game.moves.count()
+        for square, number in self.__highlighted.items():
+            marks.setdefault(square, number - ply)
+        return marks
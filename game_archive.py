@@ -0,0 +1,128 @@
+# Append-only archive of many games in one file, read through mmap.
+#
+#   <path>      MAGIC record*
+#   record      hash:u64 canonical:u64 name_length:u16 width:u8 height:u8 move_count:u16 result:u8
+#               name:utf8 (x:u8 y:u8)*
+#   <path>.idx  offset:u64 per record, in append order
+#
+# All integers are little endian. A record is written before its offset, so a crash
+# in between leaves a tail that the offset table simply does not point at.
+import mmap
+import os
+import struct
+
+from game import *
+import symmetry
+
+
+MAGIC = b'XOA2'
+EXTENSION = '.xoa'
+INDEX_EXTENSION = '.xoa.idx'
+HEADER = struct.Struct('<QQHBBHB')
+OFFSET = struct.Struct('<Q')
+RESULTS = ["", "X", "O", "draw"]
+
+
+class BadArchive(BaseException):
+    ...
+
+
+class GameArchive:
+    def __init__(self, path):
+        self.path = path
+        self.index_path = path[:-len(EXTENSION)] + INDEX_EXTENSION if path.endswith(EXTENSION) else path + '.idx'
+        self.__data = None
+        self.__offsets = None
+        # the files are created by the first append, so reading leaves no trace
+        self.__count = os.path.getsize(self.index_path) // OFFSET.size if os.path.exists(self.path) else 0
+
+    def __map(self):
+        if self.__data is None:
+            with open(self.path, 'rb') as file:
+                self.__data = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+            if self.__data[0:len(MAGIC)] != MAGIC:
+                raise BadArchive
+            if self.__count:
+                with open(self.index_path, 'rb') as file:
+                    self.__offsets = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        return self.__data
+
+    def close(self):
+        for view in (self.__data, self.__offsets):
+            if view is not None:
+                view.close()
+        self.__data = None
+        self.__offsets = None
+
+    def count(self):
+        return self.__count
+
+    def __len__(self):
+        return self.__count
+
+    def __offset(self, id):
+        if not 0 <= id < self.__count:
+            raise IndexError(id)
+        self.__map()
+        return OFFSET.unpack_from(self.__offsets, id * OFFSET.size)[0]
+
+    def header(self, id):
+        offset = self.__offset(id)
+        hash, canonical, name_length, width, height, moves, result = HEADER.unpack_from(self.__data, offset)
+        name_start = offset + HEADER.size
+        return {
+            "name": self.__data[name_start: name_start + name_length].decode('utf-8'),
+            "width": width,
+            "height": height,
+            "moves": moves,
+            "result": RESULTS[result],
+            "hash": hash,
+            "canonical": canonical
+        }
+
+    def name(self, id):
+        offset = self.__offset(id)
+        name_length, = struct.unpack_from('<H', self.__data, offset + 16)
+        name_start = offset + HEADER.size
+        return self.__data[name_start: name_start + name_length].decode('utf-8')
+
+    def get(self, id):
+        offset = self.__offset(id)
+        hash, canonical, name_length, width, height, count, result = HEADER.unpack_from(self.__data, offset)
+        moves_start = offset + HEADER.size + name_length
+        moves = self.__data[moves_start: moves_start + 2 * count]
+        game = Game()
+        game.resize(width, height)
+        for i in range(0, 2 * count, 2):
+            game.move(moves[i], moves[i + 1])
+        return game
+
+    def __iter__(self):
+        for id in range(0, self.__count):
+            yield self.header(id)
+
+    def canonical(self, id):
+        offset = self.__offset(id)
+        return struct.unpack_from('<Q', self.__data, offset + 8)[0]
+
+    def append(self, name, game):
+        if game.is_over():
+            result = RESULTS.index(game.winner() or "draw")
+        else:
+            result = 0
+        name_bytes = name.encode('utf-8')
+        record = HEADER.pack(game.hash, symmetry.canonical_key(game), len(name_bytes)
+                             , game.field.width, game.field.height, game.moves.count(), result) \
+            + name_bytes + bytes(coordinate for x, y, side in game.moves for coordinate in (x, y))
+        self.close()    # the maps are reopened at the new size on the next read
+        if not os.path.exists(self.path):
+            with open(self.path, 'wb') as file:
+                file.write(MAGIC)
+            open(self.index_path, 'wb').close()
+        with open(self.path, 'ab') as file:
+            offset = file.tell()
+            file.write(record)
+        with open(self.index_path, 'ab') as file:
+            file.write(OFFSET.pack(offset))
+        self.__count += 1
+        return self.__count - 1
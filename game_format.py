@@ -0,0 +1,135 @@
+#!/usr/bin/env python
+# Compact game files: board size and move sequence only, sides alternate starting with X.
+#
+#   file   := MAGIC record*
+#   record := name_length:u16 name:utf8 width:u8 height:u8 move_count:u16 (x:u8 y:u8)*
+#
+# All integers are little endian. A file may hold one game or many packed together.
+import argparse
+import os
+import pickle
+import struct
+
+from game import *
+
+
+MAGIC = b'XOG1'
+EXTENSION = '.xog'
+
+
+class BadFormat(BaseException):
+    ...
+
+
+def encode(name, game):
+    name_bytes = name.encode('utf-8')
+    moves = bytes(coordinate for x, y, side in game.moves for coordinate in (x, y))
+    return struct.pack('<H', len(name_bytes)) + name_bytes \
+        + struct.pack('<BBH', game.field.width, game.field.height, game.moves.count()) + moves
+
+
+def decode(data, offset=0):    # -> name, game, offset of the next record
+    try:
+        name_length, = struct.unpack_from('<H', data, offset)
+        offset += 2
+        name = bytes(data[offset: offset + name_length]).decode('utf-8')
+        offset += name_length
+        width, height, count = struct.unpack_from('<BBH', data, offset)
+        offset += 4
+    except (struct.error, UnicodeDecodeError):
+        raise BadFormat
+    moves = data[offset: offset + 2 * count]
+    if len(moves) != 2 * count:
+        raise BadFormat
+    game = Game()
+    game.resize(width, height)
+    try:
+        for i in range(0, 2 * count, 2):
+            game.move(moves[i], moves[i + 1])
+    except (SquareOccupied, InvalidSquare):
+        raise BadFormat
+    return name, game, offset + 2 * count
+
+
+def write(path, records, append=False):   # records are (name, game), returns their offsets
+    offsets = []
+    with open(path, 'ab' if append else 'wb') as file:
+        if file.tell() == 0:
+            file.write(MAGIC)
+        for name, game in records:
+            offsets.append(file.tell())
+            file.write(encode(name, game))
+    return offsets
+
+
+def read(path):    # yields offset, name, game
+    with open(path, 'rb') as file:
+        data = file.read()
+    if data[0:len(MAGIC)] != MAGIC:
+        raise BadFormat
+    offset = len(MAGIC)
+    while offset < len(data):
+        name, game, next_offset = decode(data, offset)
+        yield offset, name, game
+        offset = next_offset
+
+
+def read_at(path, offset):
+    with open(path, 'rb') as file:
+        if file.read(len(MAGIC)) != MAGIC:
+            raise BadFormat
+        file.seek(offset)
+        header = file.read(2)
+        name_length, = struct.unpack('<H', header)
+        head = header + file.read(name_length + 4)
+        count, = struct.unpack_from('<H', head, len(head) - 2)
+        data = head + file.read(2 * count)
+    name, game, end = decode(data)
+    return name, game
+
+
+def convert(dir, pack=None, remove=False):     # -> games converted, their pickle bytes, bytes written
+    records = []
+    for entry in sorted(os.scandir(dir), key=lambda entry: entry.name):
+        if not entry.is_file() or entry.name.startswith('.') \
+                or entry.name.endswith((EXTENSION, '.cfg', '.xoa', '.xoa.idx')):
+            continue
+        try:
+            with open(entry.path, 'rb') as file:
+                game = pickle.load(file)
+        except (pickle.UnpicklingError, EOFError, AttributeError, ImportError):
+            print('skipping ' + entry.name + ': not a pickled game')
+            continue
+        records.append((entry.name, game, entry.path))
+
+    pickle_bytes = sum(os.path.getsize(path) for name, game, path in records)
+    if pack:
+        write(pack, [(name, game) for name, game, path in records])
+        written = os.path.getsize(pack)
+    else:
+        written = 0
+        for name, game, path in records:
+            write(os.path.join(dir, name + EXTENSION), [(name, game)])
+            written += os.path.getsize(os.path.join(dir, name + EXTENSION))
+    if remove:
+        for name, game, path in records:
+            os.remove(path)
+    return len(records), pickle_bytes, written
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Convert pickled db games into the compact .xog format')
+    parser.add_argument('dir', nargs='?', default='db')
+    parser.add_argument('--pack', help='write every game into this single file instead of one file per game')
+    parser.add_argument('--remove', action='store_true'
+                        , help='delete the pickles after converting, they are kept by default')
+    args = parser.parse_args()
+
+    count, pickle_bytes, written = convert(args.dir, args.pack, args.remove)
+    print('converted %d games: %d bytes of pickles -> %d bytes' % (count, pickle_bytes, written))
+    if not args.remove:
+        print('the pickles are kept, Games_DB lists the converted copies instead')
+
+
+if __name__ == '__main__':
+    main()
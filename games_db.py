@@ -1,32 +1,186 @@
+import json
 import os
 import pickle
+import time
+
+import game_archive
+import game_format
+import symmetry
 
 
 class Games_DB():
+    INDEX_NAME = '.index'
+    INDEX_VERSION = 4     # 4: canonical keys take the board edges into account
+    ARCHIVE_NAME = 'games' + game_archive.EXTENSION
+
     def __init__(self, dir='db'):
         self.dir = dir
         if not os.path.isdir(dir):
             os.makedirs(dir)
-        self.games = []
-        for _, _, names in os.walk(dir):
-            for file in names:
-                nextpath = os.path.join(dir, file)
-                self.__append(file, pickle.load(open(nextpath, "rb")))
-            break
-        self.games.sort(key=self.__record_key)
+        self.games = []     # metadata records sorted by name, games are loaded by get()
+                            # a record points at a pickle file or at an offset inside an .xog file
+        self.archive = game_archive.GameArchive(os.path.join(dir, self.ARCHIVE_NAME))
+                            # ids past the file records address the archive in append order
+        self.__loaded = {}
+        self.__index_path = os.path.join(dir, self.INDEX_NAME)
+        self.__dir_mtime = None
+        self.generation = time.time_ns()    # bumped by every change to the games, kept in the index file;
+                                            # a new index starts from the clock so it never repeats an old one
+        self.__load_index()
+        self.refresh()
 
     def __record_key(self, record):
         return record["name"]
 
-    def __append(self, name, game):
-        self.games.append({
-            "data" : game,
-            "name" : name
-        })
+    def __load_index(self):
+        try:
+            with open(self.__index_path) as file:
+                index = json.load(file)
+        except (OSError, ValueError):
+            return
+        if index.get("version") != self.INDEX_VERSION:
+            return
+        self.__dir_mtime = index["dir_mtime"]
+        self.games = index["games"]
+        self.generation = index.get("generation", self.generation)
+
+    def __save_index(self):
+        # rewriting an existing file leaves the directory mtime alone, creating one does not
+        if not os.path.exists(self.__index_path):
+            open(self.__index_path, 'w').close()
+        self.__dir_mtime = os.stat(self.dir).st_mtime_ns
+        with open(self.__index_path, 'w') as file:
+            json.dump({"version": self.INDEX_VERSION, "dir_mtime": self.__dir_mtime, "generation": self.generation
+                       , "games": self.games}, file)
+
+    def __make_record(self, name, game, file, offset, stat):
+        if game.is_over():
+            result = game.winner() or "draw"
+        else:
+            result = ""
+        return {
+            "name": name,
+            "file": file,
+            "offset": offset,
+            "width": game.field.width,
+            "height": game.field.height,
+            "moves": game.moves.count(),
+            "result": result,
+            "hash": game.hash,
+            "canonical": symmetry.canonical_key(game),
+            "mtime": stat.st_mtime_ns,
+            "size": stat.st_size
+        }
+
+    def refresh(self, full=False):
+        # adding, removing or renaming a file touches the directory, so an unchanged
+        # directory means an up to date index; full=True also catches files rewritten in place
+        if not full and self.__dir_mtime == os.stat(self.dir).st_mtime_ns:
+            return
+        known = {}
+        for record in self.games:
+            known.setdefault(record["file"], []).append(record)
+        records = []
+        for entry in os.scandir(self.dir):
+            if not entry.is_file() or entry.name.startswith('.') \
+                    or entry.name.endswith((game_archive.EXTENSION, game_archive.INDEX_EXTENSION, '.cfg')):
+                continue
+            stat = entry.stat()
+            file_records = known.pop(entry.name, None)
+            if file_records is None or file_records[0]["mtime"] != stat.st_mtime_ns \
+                    or file_records[0]["size"] != stat.st_size:
+                file_records = self.__scan(entry.name, stat)
+            records.extend(file_records)
+        converted = set(record["name"] for record in records if record["offset"] is not None)
+        records = [record for record in records if record["offset"] is not None or record["name"] not in converted]
+        self.__loaded = {}
+        records.sort(key=self.__record_key)
+        if records != self.games:   # a game file added, removed, renamed or rewritten
+            self.generation += 1
+        self.games = records
+        self.__save_index()
+
+    def __scan(self, file, stat):
+        path = os.path.join(self.dir, file)
+        try:
+            if file.endswith(game_format.EXTENSION):
+                return [self.__make_record(name, game, file, offset, stat)
+                        for offset, name, game in game_format.read(path)]
+            with open(path, "rb") as device:
+                return [self.__make_record(file, pickle.load(device), file, None, stat)]
+        except (OSError, game_format.BadFormat, pickle.UnpicklingError, EOFError, AttributeError, ImportError):
+            print('games_db: cannot read ' + file)
+            return []
+
+    def __read(self, record):
+        path = os.path.join(self.dir, record["file"])
+        try:
+            if record["offset"] is not None:
+                return game_format.read_at(path, record["offset"])[1]
+            with open(path, "rb") as device:
+                return pickle.load(device)
+        except (OSError, game_format.BadFormat, pickle.UnpicklingError, EOFError, AttributeError, ImportError):
+            print('games_db: cannot read ' + record["file"])
+            return None
+
+    def get(self, id):
+        if id >= len(self.games):
+            return self.archive.get(id - len(self.games))
+        record = self.games[id]
+        key = record["file"], record["offset"]
+        if key not in self.__loaded:
+            self.__loaded[key] = self.__read(record)
+        return self.__loaded[key]
+
+    def find(self, name):   # the latest game saved under that name
+        for id in range(self.archive.count() - 1, -1, -1):
+            if self.archive.name(id) == name:
+                return len(self.games) + id
+        for id, record in enumerate(self.games):
+            if record["name"] == name:
+                return id
+        return None
+
+    def find_equivalent(self, game):    # a stored game with the same moves in the same order up to symmetry
+        key = symmetry.canonical_key(game)
+        for id, record in enumerate(self.games):
+            if record["canonical"] == key and record["moves"] == game.moves.count() \
+                    and self.__same_sequence(id, game):
+                return id
+        for id in range(0, self.archive.count()):
+            if self.archive.canonical(id) == key and self.archive.header(id)["moves"] == game.moves.count() \
+                    and self.__same_sequence(len(self.games) + id, game):
+                return len(self.games) + id
+        return None
+
+    def __same_sequence(self, id, game):    # the key only says the final positions match
+        stored = self.get(id)
+        return stored is not None and symmetry.same_sequence(stored, game)
+
+    def count(self):
+        return len(self.games) + self.archive.count()
+
+    def __iter__(self):
+        for record in self.games:
+            yield record
+        for record in self.archive:
+            yield record
+
+    def __getitem__(self, id):
+        if id >= len(self.games):
+            return self.archive.header(id - len(self.games))
+        return self.games[id]
 
-    def append(self, name, game):
-        self.__append(name, game.make_copy())
-        pickle.dump(game, open(os.path.join(self.dir, name), "wb"))
+    def append(self, name, game):   # returns the id of the stored game, which may be an equivalent older one
+        id = self.find_equivalent(game)
+        if id is not None:
+            print('games_db: ' + name + ' not saved, the same game is stored as ' + self[id]["name"])
+            return id
+        id = len(self.games) + self.archive.append(name, game)
+        self.generation += 1
+        self.__save_index()
+        return id
 
     def names(self):
-        return [record["name"] for record in self.games]
\ No newline at end of file
+        return [record["name"] for record in self.games] \
+            + [self.archive.name(id) for id in range(0, self.archive.count())]
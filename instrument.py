@@ -0,0 +1,70 @@
+# Call counters and timers for hot paths. The listed methods are wrapped in place by
+# install() and restored by uninstall(); while instrumentation is off nothing is wrapped,
+# so the methods run exactly as written.
+import functools
+import importlib
+import time
+
+
+TARGETS = [("engine", "EngineController", "send_command"),
+           ("engine", "EngineController", "pipeline"),
+           ("engine", "EngineController", "on_engine_output"),
+           ("game", "Game", "move"),
+           ("game", "Game", "check_win"),
+           ("game", "GameObserver", "reset"),
+           ("BoardWidget", "QBoardWidget", "paintEvent")]
+
+
+class Instrumentation:
+    def __init__(self):
+        self.stats = {}     # name -> [calls, total seconds, max seconds]
+        self.started = time.perf_counter()
+        self.__originals = []
+
+    def installed(self):
+        return len(self.__originals) > 0
+
+    def install(self, targets=TARGETS):
+        for module_name, class_name, method_name in targets:
+            cls = getattr(importlib.import_module(module_name), class_name)
+            original = cls.__dict__[method_name]
+            self.__originals.append((cls, method_name, original))
+            setattr(cls, method_name, self.__wrap(class_name + '.' + method_name, original))
+
+    def uninstall(self):
+        for cls, method_name, original in reversed(self.__originals):
+            setattr(cls, method_name, original)
+        self.__originals = []
+
+    def __wrap(self, name, function):
+        stat = self.stats.setdefault(name, [0, 0.0, 0.0])
+        clock = time.perf_counter
+
+        @functools.wraps(function)
+        def timed(*args, **kwargs):
+            start = clock()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                elapsed = clock() - start
+                stat[0] += 1    # calls from the brain reader threads may race, counts are approximate
+                stat[1] += elapsed
+                if elapsed > stat[2]:
+                    stat[2] = elapsed
+        return timed
+
+    def reset(self):
+        for stat in self.stats.values():
+            stat[0:3] = [0, 0.0, 0.0]
+        self.started = time.perf_counter()
+
+    def snapshot(self):
+        lines = ['instrumentation over %.1f s' % (time.perf_counter() - self.started)]
+        for name, (calls, total, longest) in sorted(self.stats.items(), key=lambda item: -item[1][1]):
+            lines.append('%-36s %9d calls %10.3f s total %9.3f ms mean %9.3f ms max'
+                         % (name, calls, total, 1000 * total / calls if calls else 0, 1000 * longest))
+        return lines
+
+    def dump(self, path):
+        with open(path, 'a') as file:
+            file.write(time.strftime('%Y-%m-%d %H:%M:%S ') + '\n'.join(self.snapshot()) + '\n\n')
@@ -0,0 +1,168 @@
+#!/usr/bin/env python
+# Index from position hash to (game id, ply) over every position of every game in a Games_DB.
+#
+#   file  := MAGIC generation:u64 archive_count:u64 entry*
+#   entry := hash:u64 game:u32 ply:u16 pad:u16, sorted by hash
+#
+# Games_DB.generation goes up by one for every appended game and for any other change.
+# While it has gone up exactly as much as the archive grew, only appends happened since
+# the build, and those games are indexed in memory until they outgrow a tenth of the file;
+# anything else rebuilds the file.
+import argparse
+import bisect
+import mmap
+import os
+import struct
+import time
+
+from game import *
+from games_db import Games_DB
+
+
+MAGIC = b'XOP3'    # 3: the empty board is indexed at ply 0
+STAMP = struct.Struct('<QQ')
+ENTRY = struct.Struct('<QIHxx')
+
+
+class PositionIndex:
+    FILE_NAME = '.positions'
+
+    def __init__(self, games_db):
+        self.games_db = games_db
+        self.path = os.path.join(games_db.dir, self.FILE_NAME)
+        self.__data = None
+        self.__count = 0
+        self.__stamp = None
+        self.__tail = {}        # hash -> [(game, ply)] for archive games newer than the file
+        self.__tail_from = 0    # first archive id that is not in the file
+
+    def __signature(self):
+        return self.games_db.generation, self.games_db.archive.count()
+
+    def __open(self):
+        self.close()
+        try:
+            with open(self.path, 'rb') as file:
+                if file.read(len(MAGIC)) != MAGIC:
+                    return False
+                stamp = STAMP.unpack(file.read(STAMP.size))
+                self.__data = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, struct.error, ValueError):
+            return False
+        self.__stamp = stamp
+        self.__count = (len(self.__data) - len(MAGIC) - STAMP.size) // ENTRY.size
+        self.__tail = {}
+        self.__tail_from = stamp[1]
+        return True
+
+    def close(self):
+        if self.__data is not None:
+            self.__data.close()
+        self.__data = None
+        self.__count = 0
+
+    def __positions(self, id):
+        game = self.games_db.get(id)
+        if game is None:
+            return
+        hash = 0
+        yield hash, 0   # the empty board, every game goes through it
+        for ply, (x, y, side) in enumerate(game.moves, 1):
+            hash ^= Zobrist.key(x, y, side)
+            yield hash, ply
+
+    def build(self):
+        self.close()
+        signature = self.__signature()
+        entries = []
+        for id in range(0, self.games_db.count()):
+            for hash, ply in self.__positions(id):
+                entries.append((hash, id, ply))
+        entries.sort()
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'wb') as file:
+            file.write(MAGIC + STAMP.pack(*signature))
+            for entry in entries:
+                file.write(ENTRY.pack(*entry))
+        os.replace(tmp_path, self.path)
+        self.__open()
+
+    def update(self):
+        signature = self.__signature()
+        if self.__stamp is None and not self.__open():
+            self.build()
+            return
+        generation, archive_count = signature
+        appended = archive_count - self.__stamp[1]
+        if appended < 0 or generation - self.__stamp[0] != appended:
+            self.build()
+            return
+        if appended > max(1000, self.games_db.count() // 10):
+            self.build()
+            return
+        first_file_id = len(self.games_db.games)
+        for archive_id in range(self.__tail_from, archive_count):
+            for hash, ply in self.__positions(first_file_id + archive_id):
+                self.__tail.setdefault(hash, []).append((first_file_id + archive_id, ply))
+        self.__tail_from = archive_count
+
+    def lookup(self, hash):     # [(game id, ply)]
+        self.update()
+        result = []
+        if self.__count:
+            keys = _EntryKeys(self)
+            i = bisect.bisect_left(keys, hash)
+            while i < self.__count:
+                entry_hash, id, ply = ENTRY.unpack_from(self.__data, len(MAGIC) + STAMP.size + i * ENTRY.size)
+                if entry_hash != hash:
+                    break
+                result.append((id, ply))
+                i += 1
+        return result + self.__tail.get(hash, [])
+
+    def games_through(self, game):     # [(game id, first ply that reached the position)]
+        w, h, hash = game.position_key()
+        first_ply = {}
+        for id, ply in self.lookup(hash):
+            record = self.games_db[id]
+            if (record["width"], record["height"]) == (w, h) and ply == game.moves.count():
+                first_ply.setdefault(id, ply)
+        return sorted(first_ply.items())
+
+    def results(self, game):    # result -> number of games that went through the position
+        counts = {"X": 0, "O": 0, "draw": 0, "": 0}
+        for id, ply in self.games_through(game):
+            counts[self.games_db[id]["result"]] += 1
+        return counts
+
+    def entry_count(self):
+        return self.__count
+
+    def hash_at(self, i):
+        return ENTRY.unpack_from(self.__data, len(MAGIC) + STAMP.size + i * ENTRY.size)[0]
+
+
+class _EntryKeys:     # sequence view of the sorted hashes for bisect
+    def __init__(self, index):
+        self.index = index
+
+    def __len__(self):
+        return self.index.entry_count()
+
+    def __getitem__(self, i):
+        return self.index.hash_at(i)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Build the position index of a games database')
+    parser.add_argument('dir', nargs='?', default='db')
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    index = PositionIndex(Games_DB(args.dir))
+    index.build()
+    print('indexed %d positions in %.2f s' % (index.entry_count(), time.perf_counter() - start))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,316 @@
+# Built-in brain: alpha-beta over threat-ordered candidate moves, iterative deepening
+# under INFO timeout_turn and a transposition table keyed by Zobrist hashes.
+#
+# ReferenceBrain stands in for BrainDaemon.Brain and talks the same Gomocup text
+# protocol from a thread, so EngineController drives it like any external brain.
+# engines.cfg selects it with the path builtin:reference.
+import queue
+import threading
+import time
+
+from game import Zobrist
+
+
+PATH = 'builtin:reference'
+WIN = 10000000
+DIRECTIONS = ((1, 0), (0, 1), (1, 1), (1, -1))
+# (stones in the line after the move, open ends) -> value
+PATTERNS = {(5, 0): WIN, (5, 1): WIN, (5, 2): WIN,
+            (4, 2): 100000, (4, 1): 10000,
+            (3, 2): 5000, (3, 1): 500,
+            (2, 2): 200, (2, 1): 30,
+            (1, 2): 10, (1, 1): 2}
+SIDE_TO_MOVE_KEY = Zobrist.key(511, 511, "O")
+
+
+class OutOfTime(BaseException):
+    ...
+
+
+class Board:
+    def __init__(self, width, height):
+        self.width = width
+        self.height = height
+        self.cells = [0] * (width * height)     # 0 empty, 1 own, 2 opponent
+        self.near = [0] * (width * height)      # stones within two squares
+        self.stones = []
+        self.hash = 0
+        self.__neighbours = [[ny * width + nx
+                              for ny in range(max(0, y - 2), min(height, y + 3))
+                              for nx in range(max(0, x - 2), min(width, x + 3))]
+                             for y in range(0, height) for x in range(0, width)]
+        # a stone changes the values of squares up to 5 away along its lines, no others
+        self.__lines = [[(y + k * dy) * width + x + k * dx
+                         for dx, dy in DIRECTIONS for k in range(-5, 6)
+                         if 0 <= x + k * dx < width and 0 <= y + k * dy < height]
+                        for y in range(0, height) for x in range(0, width)]
+        self.__values = {1: [None] * (width * height), 2: [None] * (width * height)}
+
+    def place(self, x, y, who):
+        self.cells[y * self.width + x] = who
+        for i in self.__neighbours[y * self.width + x]:
+            self.near[i] += 1
+        self.__forget(y * self.width + x)
+        self.stones.append((x, y))
+        self.hash ^= Zobrist.key(x, y, "X" if who == 1 else "O")
+
+    def remove(self):
+        x, y = self.stones.pop()
+        who = self.cells[y * self.width + x]
+        self.cells[y * self.width + x] = 0
+        for i in self.__neighbours[y * self.width + x]:
+            self.near[i] -= 1
+        self.__forget(y * self.width + x)
+        self.hash ^= Zobrist.key(x, y, "X" if who == 1 else "O")
+
+    def empty(self, x, y):
+        return 0 <= x < self.width and 0 <= y < self.height and self.cells[y * self.width + x] == 0
+
+    def __forget(self, i):
+        own, other = self.__values[1], self.__values[2]
+        for j in self.__lines[i]:
+            own[j] = other[j] = None
+
+    def value(self, x, y, who):     # what a stone of who at the empty x, y would make
+        cache = self.__values[who]
+        cached = cache[y * self.width + x]
+        if cached is None:
+            cached = cache[y * self.width + x] = self.__value(x, y, who)
+        return cached
+
+    def __value(self, x, y, who):
+        cells, w, h = self.cells, self.width, self.height
+        total = 0
+        for dx, dy in DIRECTIONS:
+            count, open_ends = 1, 0
+            for sign in (1, -1):
+                cx, cy = x + sign * dx, y + sign * dy
+                while 0 <= cx < w and 0 <= cy < h and cells[cy * w + cx] == who:
+                    count += 1
+                    cx += sign * dx
+                    cy += sign * dy
+                if 0 <= cx < w and 0 <= cy < h and cells[cy * w + cx] == 0:
+                    open_ends += 1
+            total += PATTERNS.get((min(count, 5), open_ends), 0)
+        return total
+
+    def candidates(self):   # empty squares within two of a stone
+        if not self.stones:
+            return [(self.width // 2, self.height // 2)]
+        w, cells, near = self.width, self.cells, self.near
+        return [(i % w, i // w) for i in range(0, len(cells)) if near[i] and not cells[i]]
+
+
+class Search:
+    def __init__(self, board):
+        self.board = board
+        self.table = {}     # hash -> (depth, value, bound, move)
+        self.nodes = 0
+        self.deadline = None
+        self.stop = None    # threading.Event that aborts the search
+
+    def ordered_moves(self, who, width):    # -> moves, static value for who, who wins with moves[0]
+        board = self.board
+        other = 3 - who
+        scored = []
+        best_attack = best_defence = 0
+        for x, y in board.candidates():
+            attack = board.value(x, y, who)
+            defence = board.value(x, y, other)
+            if attack >= WIN:
+                return [(x, y)], WIN, True
+            scored.append((attack + defence * 4 // 5, defence, x, y))
+            best_attack = max(best_attack, attack)
+            best_defence = max(best_defence, defence)
+        scored.sort(reverse=True)
+        value = best_attack - best_defence // 2     # the side to move gets its best threat in first
+        forced = [(x, y) for score, defence, x, y in scored if defence >= WIN]
+        if forced:
+            return forced, value, False
+        return [(x, y) for score, defence, x, y in scored[0:width]], value, False
+
+    def negamax(self, depth, alpha, beta, who):
+        self.nodes += 1
+        if self.nodes & 15 == 0 and (time.perf_counter() > self.deadline or self.stop.is_set()):
+            raise OutOfTime
+
+        board = self.board
+        key = board.hash ^ (SIDE_TO_MOVE_KEY if who == 2 else 0)
+        entry = self.table.get(key)
+        tt_move = None
+        if entry is not None:
+            entry_depth, value, bound, tt_move = entry
+            if entry_depth >= depth:
+                if bound == 0 or (bound < 0 and value <= alpha) or (bound > 0 and value >= beta):
+                    return value
+
+        moves, static_value, winning = self.ordered_moves(who, 8)
+        if winning:
+            return WIN - len(board.stones)
+        if not moves:
+            return 0
+        if depth == 0:
+            return static_value
+        if tt_move in moves:
+            moves.remove(tt_move)
+            moves.insert(0, tt_move)
+
+        original_alpha = alpha
+        best_value, best_move = -WIN * 2, moves[0]
+        for x, y in moves:
+            board.place(x, y, who)
+            try:
+                value = -self.negamax(depth - 1, -beta, -alpha, 3 - who)
+            finally:
+                board.remove()
+            if value > best_value:
+                best_value, best_move = value, (x, y)
+            alpha = max(alpha, value)
+            if alpha >= beta:
+                break
+
+        bound = 0
+        if best_value <= original_alpha:
+            bound = -1
+        elif best_value >= beta:
+            bound = 1
+        self.table[key] = (depth, best_value, bound, best_move)
+        return best_value
+
+    def best_move(self, seconds, stop, max_depth=20):   # -> move, depth reached
+        self.deadline = time.perf_counter() + seconds
+        self.stop = stop
+        self.nodes = 0
+        moves, static_value, winning = self.ordered_moves(1, 12)
+        if winning or len(moves) == 1:
+            return moves[0], 0
+        best, reached = moves[0], 0
+        for depth in range(1, max_depth + 1):
+            try:
+                value = self.negamax(depth, -WIN * 2, WIN * 2, 1)
+            except OutOfTime:
+                break
+            key = self.board.hash
+            best, reached = self.table[key][3], depth
+            if abs(value) >= WIN - 1000:
+                break
+        return best, reached
+
+
+class ReferenceBrain:   # the BrainDaemon.Brain interface: send_message, exit_code, shutdown, kill
+    ABOUT = 'name="reference", version="1.0", author="XO", country="-"'
+
+    def __init__(self, path, on_stdout=None, on_stderr=None, on_shutdown=None):
+        self.__on_stdout = on_stdout
+        self.__on_shutdown = on_shutdown
+        self.__lines = queue.Queue()
+        self.__stop = threading.Event()
+        self.__exit_code = None
+        self.__board = None
+        self.__search = None
+        self.__board_lines = None   # collecting BOARD lines until DONE or LOAD
+        self.__timeout_turn = 1000
+        threading.Thread(target=self.__run, daemon=True).start()
+
+    def send_message(self, text):
+        for line in text.split('\n'):
+            self.__lines.put(line)
+
+    def exit_code(self):
+        return self.__exit_code
+
+    def shutdown(self):
+        self.__lines.put('END')
+
+    def kill(self):
+        self.__stop.set()
+        self.__lines.put(None)
+        self.__finish(-9)
+
+    def __finish(self, code):
+        if self.__exit_code is None:
+            self.__exit_code = code
+            if self.__on_shutdown:
+                self.__on_shutdown(code)
+
+    def __out(self, text):
+        if not self.__stop.is_set() and self.__on_stdout:
+            self.__on_stdout(text)
+
+    def __run(self):
+        while not self.__stop.is_set():
+            line = self.__lines.get()
+            if line is None:
+                break
+            if line.strip().upper() == 'END':
+                self.__finish(0)
+                return
+            try:
+                self.__handle(line.strip())
+            except (ValueError, IndexError, AttributeError):    # AttributeError: no START yet
+                self.__out('ERROR cannot parse ' + line)
+
+    def __new_board(self, width, height):
+        self.__board = Board(width, height)
+        self.__search = Search(self.__board)
+
+    def __handle(self, line):
+        if self.__board_lines is not None:
+            if line.upper() in ('DONE', 'LOAD'):
+                self.__new_board(self.__board.width, self.__board.height)
+                for x, y, who in self.__board_lines:
+                    self.__board.place(x, y, who)
+                self.__board_lines = None
+                self.__out(self.__think() if line.upper() == 'DONE' else 'OK')
+            elif line:
+                x, y, who = [int(value) for value in line.split(',')]
+                self.__board_lines.append((x, y, who))
+            return
+
+        args = line.split()
+        if not args:
+            return
+        command = args[0].upper()
+        if command == 'ABOUT':
+            self.__out(self.ABOUT)
+        elif command == 'START':
+            width = int(args[1])
+            height = int(args[2]) if len(args) > 2 else width
+            self.__new_board(width, height)
+            self.__out('OK')
+        elif command == 'RECTSTART':
+            width, height = [int(value) for value in args[1].split(',')]
+            self.__new_board(width, height)
+            self.__out('OK')
+        elif command == 'RESTART':
+            self.__new_board(self.__board.width, self.__board.height)
+            self.__out('OK')
+        elif command == 'INFO':
+            if len(args) > 2 and args[1].lower() == 'timeout_turn':
+                self.__timeout_turn = int(args[2])
+        elif command == 'BEGIN':
+            self.__out(self.__think())
+        elif command == 'TURN':
+            x, y = [int(value) for value in args[1].split(',')]
+            self.__board.place(x, y, 2)
+            self.__out(self.__think())
+        elif command == 'BOARD':
+            self.__board_lines = []
+        elif command == 'SQUAREINFO':
+            x, y = int(args[1]), int(args[2])
+            if self.__board.empty(x, y):
+                self.__out('SQUAREINFO own ' + str(self.__board.value(x, y, 1))
+                           + ' opponent ' + str(self.__board.value(x, y, 2)))
+            else:
+                self.__out('SQUAREINFO occupied')
+        else:
+            self.__out('UNKNOWN ' + line)
+
+    def __think(self):
+        seconds = max(0.05, self.__timeout_turn / 1000 * 0.8)
+        start = time.perf_counter()
+        (x, y), depth = self.__search.best_move(seconds, self.__stop)
+        self.__out('MESSAGE depth ' + str(depth) + ' nodes ' + str(self.__search.nodes)
+                   + ' time ' + str(int(1000 * (time.perf_counter() - start))) + ' ms')
+        self.__board.place(x, y, 1)
+        return str(x) + ',' + str(y)
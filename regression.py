@@ -0,0 +1,215 @@
+#!/usr/bin/env python
+import argparse
+import json
+import multiprocessing
+import re
+import time
+
+from config import Config
+from engine import EngineController, EngineCrashed, EngineTimeout
+from game import *
+from games_db import Games_DB
+
+
+# db/expected.cfg, one section per position:
+#   [Test003_4s3dFatalCounter]
+#   moves = 7,8 9,10    ; any of these passes
+#   avoid = 3,4         ; optional, any of these fails even without a moves list
+#   source = threats    ; who set it: threats for a proven win by continuous fours, else the engine name
+EXPECTED_NAME = 'expected.cfg'
+STATS_PATTERN = re.compile(r'\b(nodes|depth)\b\D{0,3}(\d+)', re.IGNORECASE)
+
+
+def parse_moves(text):
+    moves = []
+    for item in text.split():
+        x, y = item.split(',')
+        moves.append((int(x), int(y)))
+    return moves
+
+
+def load_expectations(dir):
+    config = Config.Base(dir + '/' + EXPECTED_NAME)
+    expectations = {}
+    for name in config:
+        section = config[name]
+        expectations[name] = {"moves": parse_moves(section.get("moves", "")),
+                              "avoid": parse_moves(section.get("avoid", ""))}
+    return config, expectations
+
+
+def check(expectation, move):
+    if expectation is None or not (expectation["moves"] or expectation["avoid"]):
+        return "NOEXP"
+    if move in expectation["avoid"]:
+        return "FAIL"
+    if expectation["moves"] and move not in expectation["moves"]:
+        return "FAIL"
+    return "PASS"
+
+
+def solve(task):
+    record = {"engine": task["engine_name"], "position": task["position"]}
+    game = Game()
+    game.resize(*task["size"])
+    for x, y in task["moves"]:
+        game.move(x, y)
+
+    stats = {}
+
+    def on_print(text):
+        for key, value in STATS_PATTERN.findall(text):
+            stats[key.lower()] = int(value)
+
+    engine = EngineController(0)
+    engine.con_print.connect(on_print)
+    engine.set_reply_timeout(task["timeout_turn"] / 1000 + task["margin"])
+    try:
+        engine.start(dict(task["properties"], need_local_copy=False))
+        engine.send_info('timeout_turn', task["timeout_turn"])
+        start = time.perf_counter()
+        engine.think(game, use_cache=False)
+        record["time"] = round(time.perf_counter() - start, 3)
+        x, y, side = game.moves[-1]
+        record["move"] = [x, y]
+        record["status"] = check(task["expectation"], (x, y))
+    except EngineCrashed:
+        record["status"], record["error"] = "ERROR", "crashed"
+    except EngineTimeout:
+        record["status"], record["error"] = "ERROR", "timed out"
+    except (ValueError, SquareOccupied, InvalidSquare):
+        record["status"], record["error"] = "ERROR", "bad move " + str(engine.last_text)
+    finally:
+        if engine.ready():
+            engine.kill()
+    record["nodes"] = stats.get("nodes")
+    record["depth"] = stats.get("depth")
+    if "_Unsolved" in task["position"] and record["status"] in ("PASS", "FAIL"):
+        record["status"] = "X" + record["status"]     # known unsolved: XFAIL is expected, XPASS is news
+    return record
+
+
+def load_positions(db, prefix):
+    positions = []
+    for id, record in enumerate(db):
+        if not record["name"].startswith(prefix):
+            continue
+        game = db.get(id)
+        if game is None or game.is_over():
+            continue
+        positions.append((record["name"], game))
+    return positions
+
+
+def split_forced(positions, expectations):    # positions the threat scanner answers need no brain
+    import threats      # needs numpy, only loaded when asked for
+
+    searched, results = [], []
+    for name, game in positions:
+        move = threats.forced_move(game)
+        if move is None:
+            searched.append((name, game))
+        else:
+            results.append({"engine": "threats", "position": name, "move": list(move), "time": 0
+                            , "status": check(expectations.get(name), move), "nodes": None, "depth": None})
+    return searched, results
+
+
+def make_tasks(args, engines, positions, expectations):
+    tasks = []
+    for engine_id, properties in engines.items():
+        for name, game in positions:
+            tasks.append({"engine_name": properties["name"], "properties": properties, "position": name
+                          , "size": (game.field.width, game.field.height)
+                          , "moves": [(x, y) for x, y, side in game.moves]
+                          , "expectation": expectations.get(name)
+                          , "timeout_turn": args.timeout_turn, "margin": args.margin})
+    return tasks
+
+
+def report(results):
+    lines = []
+    for record in sorted(results, key=lambda record: (record["engine"], record["position"])):
+        details = ''
+        if "move" in record:
+            details = 'move %d,%d  %6.3f s' % (record["move"][0], record["move"][1], record["time"])
+        if record.get("nodes") is not None:
+            details += '  %d nodes' % record["nodes"]
+        if record.get("error"):
+            details = record["error"]
+        lines.append('%-6s %-20s %-50s %s' % (record["status"], record["engine"], record["position"], details))
+
+    for engine in sorted(set(record["engine"] for record in results)):
+        own = [record for record in results if record["engine"] == engine]
+        counts = {}
+        for record in own:
+            counts[record["status"]] = counts.get(record["status"], 0) + 1
+        times = [record["time"] for record in own if "time" in record]
+        lines.append('%s: %s, total think time %.2f s' % (
+            engine, ', '.join(status + ' ' + str(count) for status, count in sorted(counts.items())), sum(times)))
+    return '\n'.join(lines)
+
+
+def annotate(config, results, positions, overwrite):
+    import threats
+
+    games = dict(positions)
+    done = set()
+    for record in results:
+        name = record["position"]
+        if "move" not in record or name not in games or name in done:
+            continue
+        done.add(name)
+        if name in config and not overwrite:
+            print('not annotating ' + name + ', it already has an expectation')
+            continue
+        proven = threats.vcf_moves(games[name])
+        if proven:     # every first move of a win by continuous fours, whatever the engine played
+            config[name] = {"moves": ' '.join('%d,%d' % move for move in proven), "source": "threats"}
+        else:
+            config[name] = {"moves": '%d,%d' % tuple(record["move"]), "source": record["engine"]}
+    config.save()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Run engines from engines.cfg on the db/Test* positions')
+    parser.add_argument('engines', type=int, nargs='+', help='engine ids from the engines config')
+    parser.add_argument('--config', default='engines.cfg')
+    parser.add_argument('--db', default='db')
+    parser.add_argument('--prefix', default='Test')
+    parser.add_argument('--workers', type=int, default=multiprocessing.cpu_count())
+    parser.add_argument('--timeout-turn', type=int, default=5000, help='INFO timeout_turn sent to engines, ms')
+    parser.add_argument('--margin', type=float, default=5, help='seconds an engine may overrun the turn time')
+    parser.add_argument('--skip-forced', action='store_true'
+                        , help='check positions with an immediate win or a single forced block with the threat '
+                               'scanner instead of the engines')
+    parser.add_argument('--json', help='also write the results to this file')
+    parser.add_argument('--annotate', action='store_true'
+                        , help='store expectations in ' + EXPECTED_NAME + ': proven wins by continuous fours, '
+                               'else the engine answer, which still needs checking by hand')
+    parser.add_argument('--overwrite', action='store_true', help='let --annotate replace existing expectations')
+    args = parser.parse_args()
+
+    configs = Config.Engines(args.config)
+    engines = {id: dict(configs[id]) for id in args.engines}
+    expected_config, expectations = load_expectations(args.db)
+    positions = load_positions(Games_DB(args.db), args.prefix)
+    all_positions = positions
+    forced = []
+    if args.skip_forced:
+        positions, forced = split_forced(positions, expectations)
+    tasks = make_tasks(args, engines, positions, expectations)
+
+    with multiprocessing.Pool(args.workers) as pool:
+        results = forced + pool.map(solve, tasks)
+
+    print(report(results))
+    if args.json:
+        with open(args.json, 'w') as file:
+            json.dump(results, file, indent=1)
+    if args.annotate:
+        annotate(expected_config, results, all_positions, args.overwrite)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,104 @@
+from game import *
+
+
+# A position is moved so its occupied bounding box starts at 0,0 and then put through
+# one of the 8 rotations/reflections of that box; the smallest stone list among the 8
+# is the canonical form. How far the box is from each board edge, up to EDGE, goes into
+# the key too, so a line blocked by the edge never shares a key with an open one; farther
+# edges are ignored, so users of the canonical key check that a move mapped back is still legal.
+EDGE = 5    # a five never reaches an edge farther than this from every stone
+
+
+class Transform:
+    def __init__(self, id, left, top, width, height):
+        self.id = id        # bit 0: swap axes, bit 1: mirror x, bit 2: mirror y
+        self.left = left
+        self.top = top
+        self.width = width  # size of the bounding box minus one, before the swap
+        self.height = height
+
+    def to_canonical(self, x, y):
+        u, v = x - self.left, y - self.top
+        w, h = self.width, self.height
+        if self.id & 1:
+            u, v, w, h = v, u, h, w
+        if self.id & 2:
+            u = w - u
+        if self.id & 4:
+            v = h - v
+        return u, v
+
+    def to_original(self, u, v):
+        w, h = (self.height, self.width) if self.id & 1 else (self.width, self.height)
+        if self.id & 4:
+            v = h - v
+        if self.id & 2:
+            u = w - u
+        if self.id & 1:
+            u, v = v, u
+        return u + self.left, v + self.top
+
+    def edges(self, left, right, top, bottom):     # edge distances as seen in the canonical form
+        if self.id & 1:
+            left, right, top, bottom = top, bottom, left, right
+        if self.id & 2:
+            left, right = right, left
+        if self.id & 4:
+            top, bottom = bottom, top
+        return left, right, top, bottom
+
+
+def edge_key(edges):
+    key = 0
+    for i, distance in enumerate(edges):
+        key ^= Zobrist.key(500 + i, distance, "X")   # off any board, so no square shares it
+    return key
+
+
+def forms(game):   # -> [((stones sorted, edges), Transform)] for the 8 symmetries, canonical ones first
+    stones = game.moves[:]
+    if not stones:
+        return [(([], ()), Transform(0, 0, 0, 0, 0))]
+    left = min(x for x, y, side in stones)
+    top = min(y for x, y, side in stones)
+    width = max(x for x, y, side in stones) - left
+    height = max(y for x, y, side in stones) - top
+    distances = [min(EDGE, value) for value in (left, game.field.width - 1 - left - width
+                                                , top, game.field.height - 1 - top - height)]
+
+    result = []
+    for id in range(0, 8):
+        transform = Transform(id, left, top, width, height)
+        form = sorted(transform.to_canonical(x, y) + (side,) for x, y, side in stones)
+        result.append(((form, transform.edges(*distances)), transform))
+    result.sort(key=lambda item: item[0])
+    return result
+
+
+def canonical(game):   # -> 64-bit key, Transform from the game to the canonical form
+    if not game.moves.count():
+        return 0, Transform(0, 0, 0, 0, 0)
+    (form, edges), transform = forms(game)[0]
+
+    key = edge_key(edges)
+    for u, v, side in form:
+        key ^= Zobrist.key(u, v, side)
+    return key, transform
+
+
+def canonical_key(game):
+    return canonical(game)[0]
+
+
+def same_sequence(game, other):     # the same moves in the same order, up to symmetry
+    if (game.field.width, game.field.height) != (other.field.width, other.field.height) \
+            or game.moves.count() != other.moves.count():
+        return False
+    canonical_form, transform = forms(game)[0]
+    moves = [transform.to_canonical(x, y) + (side,) for x, y, side in game.moves[:]]
+    for form, transform in forms(other):
+        if form != canonical_form:
+            break
+        if [transform.to_canonical(x, y) + (side,) for x, y, side in other.moves[:]] == moves:
+            return True
+    return False
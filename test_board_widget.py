@@ -0,0 +1,60 @@
+import os
+import random
+import types
+
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+
+from PyQt5.QtWidgets import QApplication, QWidget
+
+from BoardWidget import QBoardWidget
+from game import *
+
+
+app = QApplication.instance() or QApplication([])
+
+
+class Parent(QWidget):  # the bits of CoreWidget the board reads
+    def __init__(self, game):
+        super().__init__()
+        self.core = types.SimpleNamespace(games=[game])
+
+    def is_accept_events(self):
+        return True
+
+
+def full_paint(parent, back):   # a new widget has no cached frame, so it paints every square
+    widget = QBoardWidget(parent, 0)
+    widget.resize(500, 500)
+    for i in range(0, back):
+        widget.game_observer.backward()
+    return widget.grab().toImage()
+
+
+def test_incremental_paint_matches_full_paint():
+    rng = random.Random(21)
+    game = Game()
+    game.resize(12, 12)
+    parent = Parent(game)
+    widget = QBoardWidget(parent, 0)
+    widget.resize(500, 500)
+    back = 0
+    for step in range(0, 40):
+        action = rng.random()
+        if action < 0.5:
+            empty = [(x, y) for y in range(0, 12) for x in range(0, 12) if game.can_move(x, y)]
+            if empty:
+                game.move(*rng.choice(empty))
+            widget.update()
+            back = 0
+        elif action < 0.6:
+            if game.can_takeback():
+                game.takeback()
+            widget.update()
+            back = 0
+        elif action < 0.8:
+            widget.game_observer.backward()
+            back = min(back + 1, game.moves.count())
+        else:
+            widget.game_observer.forward()
+            back = max(back - 1, 0)
+        assert widget.grab().toImage() == full_paint(parent, back)
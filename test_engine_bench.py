@@ -0,0 +1,10 @@
+from engine_bench import percentile
+
+
+def test_percentile_nearest_rank():
+    assert percentile(list(range(1, 21)), 95) == 19
+    assert percentile(list(range(1, 101)), 99) == 99
+    assert percentile(list(range(1, 11)), 50) == 5
+    assert percentile(list(range(1, 11)), 100) == 10
+    assert percentile([3.0], 0) == 3.0
+    assert percentile([], 50) is None
@@ -0,0 +1,87 @@
+import threading
+
+import engine
+from engine import EngineController
+from game import Game
+
+
+class SlowExitBrain:    # BrainDaemon.Brain stand-in whose exit is reported from another thread, like a process
+    hang_first = True
+
+    def __init__(self, path, on_stdout=None, on_stderr=None, on_shutdown=None):
+        self.on_stdout = on_stdout
+        self.on_shutdown = on_shutdown
+        self.code = None
+        self.hang = SlowExitBrain.hang_first
+        SlowExitBrain.hang_first = False
+
+    def send_message(self, text):
+        command = text.split()[0].lower()
+        if command == 'about':
+            self.reply('name="stub", version="1"')
+        elif command == 'start':
+            self.reply('OK')
+        elif command in ('board', 'turn', 'begin') and not self.hang:
+            self.reply('0,0')
+
+    def reply(self, text):
+        threading.Thread(target=self.on_stdout, args=(text,)).start()
+
+    def exit_code(self):
+        return self.code
+
+    def shutdown(self):
+        self.kill()
+
+    def kill(self):
+        def report():
+            self.code = -9
+            self.on_shutdown(-9)
+        threading.Timer(0.2, report).start()
+
+
+def test_restart_after_timeout_with_late_exit(monkeypatch):
+    monkeypatch.setattr(engine, 'Brain', SlowExitBrain)
+    SlowExitBrain.hang_first = True
+    controller = EngineController(0)
+    controller.set_reply_timeout(0.5)
+    controller.set_retries(2)
+    controller.start({"name": "stub", "path": "stub"})
+    game = Game()
+    game.resize(15, 15)
+    game.move(7, 7)
+    controller.think(game, use_cache=False)
+    assert game.moves[-1][0:2] == (0, 0)
+    assert len(controller.incidents) == 1
+    assert not controller.locked()
+    controller.kill()
+
+
+class LateBrain(SlowExitBrain):     # answers the first move request only after the controller gave up on it
+    def send_message(self, text):
+        if self.hang and text.split()[0].lower() in ('board', 'turn', 'begin'):
+            self.hang = False
+            threading.Timer(0.6, self.on_stdout, args=('1,1',)).start()
+            return
+        SlowExitBrain.send_message(self, text)
+
+
+def test_timed_out_request_does_not_lock_or_shift_replies(monkeypatch):
+    monkeypatch.setattr(engine, 'Brain', LateBrain)
+    SlowExitBrain.hang_first = True
+    controller = EngineController(0)
+    controller.set_reply_timeout(0.3)
+    controller.start({"name": "stub", "path": "stub"})
+    game = Game()
+    game.resize(15, 15)
+    game.move(7, 7)
+    try:
+        controller.think(game, use_cache=False)
+        assert False, 'expected a timeout'
+    except engine.EngineTimeout:
+        ...
+    assert not controller.locked()
+    threading.Event().wait(0.5)     # the late 1,1 arrives and goes to the abandoned request
+    controller.think(game, use_cache=False)
+    assert game.moves[-1][0:2] == (0, 0)
+    controller.kill()
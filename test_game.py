@@ -0,0 +1,60 @@
+import random
+
+from game import *
+
+
+def test_five_matches_trace():
+    rng = random.Random(1)
+    for i in range(0, 40):
+        field = Field()
+        field.resize(rng.randint(1, 20), rng.randint(1, 20))
+        for y in range(0, field.height):
+            for x in range(0, field.width):
+                piece = rng.choice((False, False, "X", "O"))
+                if piece:
+                    field.place(piece, x, y)
+        for y in range(0, field.height):
+            for x in range(0, field.width):
+                for piece in ("X", "O"):
+                    traced = any(field.trace(x, y, piece, dx, dy) >= 4
+                                 for dx, dy in ((1, 0), (0, 1), (1, 1), (1, -1)))
+                    assert field.five(piece, x, y) == traced
+
+
+def squares(field):
+    return [field.piece(x, y) for y in range(0, field.height) for x in range(0, field.width)]
+
+
+def test_observer_walk_matches_replay():
+    rng = random.Random(22)
+    game = Game()
+    game.resize(10, 10)
+    observer = GameObserver()
+    observer.bind(game)
+    observer.reset()
+    for step in range(0, 2000):
+        action = rng.random()
+        if action < 0.3:
+            empty = [(x, y) for y in range(0, 10) for x in range(0, 10) if game.can_move(x, y)]
+            if empty:
+                game.move(*rng.choice(empty))
+            observer.reset()
+        elif action < 0.4:
+            if game.can_takeback():
+                game.takeback()
+            observer.reset()
+        elif action < 0.42:
+            game.resize(rng.choice((9, 10)), 10)
+            observer.reset()
+        elif action < 0.7:
+            observer.backward()
+        else:
+            observer.forward()
+
+        ply = len([piece for piece in squares(observer.get_field()) if piece])
+        assert squares(observer.get_field()) == squares(game.make_copy(ply).field)
+        expected = {(x, y): side for x, y, side in game.moves[0:ply]}
+        for number in range(ply + 1, game.moves.count() + 1):
+            x, y, side = game.moves[number - 1]
+            expected[(x, y)] = number - ply
+        assert observer.marks() == expected
@@ -0,0 +1,77 @@
+import random
+
+import pytest
+
+from game import *
+import game_archive
+import game_format
+import symmetry
+
+
+def random_game(rng):
+    width, height = rng.randint(5, 20), rng.randint(5, 20)
+    game = Game()
+    game.resize(width, height)
+    for i in range(0, rng.randint(0, 40)):
+        empty = [(x, y) for y in range(0, height) for x in range(0, width) if game.can_move(x, y)]
+        if not empty or game.is_over():
+            break
+        game.move(*rng.choice(empty))
+    return game
+
+
+def same_game(game, other):
+    return (game.field.width, game.field.height) == (other.field.width, other.field.height) \
+        and game.moves[:] == other.moves[:] and game.hash == other.hash
+
+
+def test_format_round_trip(tmp_path):
+    rng = random.Random(5)
+    records = [('game ' + str(i) + ' ü', random_game(rng)) for i in range(0, 20)]
+    for name, game in records:
+        decoded_name, decoded, end = game_format.decode(game_format.encode(name, game))
+        assert decoded_name == name and same_game(decoded, game)
+
+    path = str(tmp_path / ('games' + game_format.EXTENSION))
+    offsets = game_format.write(path, records[0:10])
+    offsets += game_format.write(path, records[10:], append=True)
+    read = list(game_format.read(path))
+    assert [offset for offset, name, game in read] == offsets
+    for (offset, name, game), (expected_name, expected) in zip(read, records):
+        assert name == expected_name and same_game(game, expected)
+        read_name, read_game = game_format.read_at(path, offset)
+        assert read_name == expected_name and same_game(read_game, expected)
+
+
+def test_format_rejects_damaged_records():
+    game = Game()
+    game.resize(15, 15)
+    game.move(7, 7)
+    game.move(8, 8)
+    data = game_format.encode('damaged', game)
+    with pytest.raises(game_format.BadFormat):
+        game_format.decode(data[:-1])
+    with pytest.raises(game_format.BadFormat):
+        game_format.decode(data[:-2] + data[-4:-2])     # the same square twice
+
+
+def test_archive_round_trip(tmp_path):
+    rng = random.Random(6)
+    records = [('game ' + str(i), random_game(rng)) for i in range(0, 20)]
+    archive = game_archive.GameArchive(str(tmp_path / ('games' + game_archive.EXTENSION)))
+    assert archive.count() == 0
+    for i, (name, game) in enumerate(records):
+        assert archive.append(name, game) == i
+
+    reopened = game_archive.GameArchive(archive.path)
+    assert reopened.count() == len(records)
+    for id, (name, game) in enumerate(records):
+        assert same_game(reopened.get(id), game)
+        assert reopened.name(id) == name
+        assert reopened.canonical(id) == symmetry.canonical_key(game)
+        header = reopened.header(id)
+        assert (header["name"], header["width"], header["height"], header["moves"], header["hash"]) \
+            == (name, game.field.width, game.field.height, game.moves.count(), game.hash)
+        assert header["result"] == ((game.winner() or "draw") if game.is_over() else "")
+    reopened.close()
+    archive.close()
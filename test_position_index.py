@@ -0,0 +1,30 @@
+from game import *
+from games_db import Games_DB
+from position_index import PositionIndex
+
+
+def make_game(width, moves):
+    game = Game()
+    game.resize(width, width)
+    for x, y in moves:
+        game.move(x, y)
+    return game
+
+
+def test_games_through(tmp_path):
+    db = Games_DB(str(tmp_path))
+    first = db.append('first', make_game(15, ((7, 7), (8, 8), (9, 9))))
+    second = db.append('second', make_game(15, ((7, 7), (6, 6))))
+    other_size = db.append('other size', make_game(19, ((7, 7),)))
+    index = PositionIndex(db)
+    index.build()
+
+    assert index.games_through(make_game(15, ())) == [(first, 0), (second, 0)]
+    assert index.games_through(make_game(15, ((7, 7),))) == [(first, 1), (second, 1)]
+    assert index.games_through(make_game(15, ((7, 7), (8, 8)))) == [(first, 2)]
+    assert index.games_through(make_game(19, ())) == [(other_size, 0)]
+
+    appended = db.append('appended', make_game(15, ((1, 1),)))
+    assert index.games_through(make_game(15, ())) == [(first, 0), (second, 0), (appended, 0)]
+    assert index.results(make_game(15, ()))[""] == 3
+    index.close()
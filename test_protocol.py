@@ -0,0 +1,45 @@
+from engine import Protocol
+from game import Game
+
+
+def new_game():
+    game = Game()
+    game.resize(15, 15)
+    return game
+
+
+def test_unseen_moves():
+    game = new_game()
+    assert Protocol.unseen_moves(None, game) is None
+    game.move(7, 7)
+    known = Protocol.snapshot(game, "X")
+    assert Protocol.unseen_moves(known, game) == []
+    game.move(8, 8)
+    game.move(9, 9)
+    assert Protocol.unseen_moves(known, game) == [(8, 8, "O"), (9, 9, "X")]
+    game.takeback()
+    game.takeback()
+    game.takeback()
+    assert Protocol.unseen_moves(known, game) is None    # a move the brain saw was taken back
+    game.move(7, 7)
+    game.resize(19, 19)
+    assert Protocol.unseen_moves(known, game) is None
+
+
+def test_opponent_move():
+    game = new_game()
+    game.move(7, 7)
+    known = Protocol.snapshot(game, "X")
+    assert Protocol.opponent_move(known, game) is None
+    game.move(8, 8)
+    assert Protocol.opponent_move(known, game) == (8, 8, "O")
+    game.move(9, 9)
+    assert Protocol.opponent_move(known, game) is None
+
+    game = new_game()
+    game.move(7, 7)
+    known = Protocol.snapshot(game, "O")    # the brain plays O, its own moves are not news to it
+    assert Protocol.opponent_move(known, game) is None
+    game.move(8, 8)
+    assert Protocol.opponent_move(known, game) is None
+    assert Protocol.opponent_move(Protocol.snapshot(new_game()), game) is None
@@ -0,0 +1,71 @@
+import random
+
+from game import *
+import symmetry
+
+
+def random_game(rng, size, count):
+    game = Game()
+    game.resize(size, size)
+    for i in range(0, count):
+        empty = [(x, y) for y in range(0, size) for x in range(0, size) if game.can_move(x, y)]
+        if not empty or game.is_over():
+            break
+        game.move(*rng.choice(empty))
+    return game
+
+
+def transformed(game, id):   # the same moves through one of the 8 symmetries of the square board
+    n = game.field.width - 1
+    result = Game()
+    result.resize(game.field.width, game.field.height)
+    for x, y, side in game.moves:
+        if id & 1:
+            x, y = y, x
+        if id & 2:
+            x = n - x
+        if id & 4:
+            y = n - y
+        result.move(x, y)
+    return result
+
+
+def test_transform_round_trip():
+    rng = random.Random(3)
+    for i in range(0, 50):
+        game = random_game(rng, 15, rng.randint(1, 30))
+        for form, transform in symmetry.forms(game):
+            for x, y, side in game.moves:
+                assert transform.to_original(*transform.to_canonical(x, y)) == (x, y)
+        key, transform = symmetry.canonical(game)
+        u, v = transform.to_canonical(*game.moves[0][0:2])
+        assert transform.to_original(u, v) == game.moves[0][0:2]
+
+
+def test_canonical_key_is_symmetric():
+    rng = random.Random(4)
+    for i in range(0, 50):
+        game = random_game(rng, 15, rng.randint(0, 30))
+        for id in range(0, 8):
+            other = transformed(game, id)
+            assert symmetry.canonical_key(other) == symmetry.canonical_key(game)
+            assert symmetry.same_sequence(other, game)
+
+
+def test_edges_and_order_matter():
+    near, far = Game(), Game()
+    near.resize(15, 15)
+    far.resize(15, 15)
+    near.move(0, 7)
+    far.move(7, 7)
+    assert symmetry.canonical_key(near) != symmetry.canonical_key(far)
+
+    first, second = Game(), Game()
+    first.resize(15, 15)
+    second.resize(15, 15)
+    for x, y in ((7, 7), (8, 8), (6, 7), (9, 9)):
+        first.move(x, y)
+    for x, y in ((6, 7), (8, 8), (7, 7), (9, 9)):
+        second.move(x, y)
+    assert symmetry.canonical_key(first) == symmetry.canonical_key(second)
+    assert not symmetry.same_sequence(first, second)
@@ -0,0 +1,104 @@
+import random
+
+import numpy
+
+from game import *
+import threats
+from threats import DIRECTIONS, FIVE, FOUR, NONE, OPEN_FOUR, OPEN_THREE, THREE
+
+
+def random_game(rng, width, height, count):
+    game = Game()
+    game.resize(width, height)
+    for i in range(0, count):
+        empty = [(x, y) for y in range(0, height) for x in range(0, width) if game.can_move(x, y)]
+        if not empty or game.is_over():
+            break
+        game.move(*rng.choice(empty))
+    return game
+
+
+def plain_level(field, x, y, side, dx, dy):     # the rules of the threats.py header, one window at a time
+    through = {4: 0, 3: 0, 2: 0}
+    for j in range(0, 5):
+        squares = [(x + (k - j) * dx, y + (k - j) * dy) for k in range(0, 5)]
+        if not all(field.valid_square(sx, sy) for sx, sy in squares):
+            continue
+        pieces = [field.piece(sx, sy) for sx, sy in squares]
+        if any(piece and piece != side for piece in pieces):
+            continue
+        stones = pieces.count(side)
+        if stones in through:
+            through[stones] += 1
+    if through[4]:
+        return FIVE
+    if through[3] >= 2:
+        return OPEN_FOUR
+    if through[3]:
+        return FOUR
+    if through[2] >= 2:
+        return OPEN_THREE
+    if through[2]:
+        return THREE
+    return NONE
+
+
+def test_scan_matches_plain_loop():
+    rng = random.Random(19)
+    for i in range(0, 30):
+        width, height = rng.randint(5, 15), rng.randint(5, 15)
+        game = random_game(rng, width, height, rng.randint(0, width * height // 2))
+        maps = threats.scan(game.field)
+        for side, threat_map in maps.items():
+            expected = numpy.zeros((len(DIRECTIONS), height, width), numpy.int8)
+            for d, (dx, dy) in enumerate(DIRECTIONS):
+                for y in range(0, height):
+                    for x in range(0, width):
+                        if not game.field.piece(x, y):
+                            expected[d, y, x] = plain_level(game.field, x, y, side, dx, dy)
+            assert (threat_map.levels == expected).all()
+
+
+def fives(field, side):
+    return [(x, y) for y in range(0, field.height) for x in range(0, field.width)
+            if not field.piece(x, y) and field.five(side, x, y)]
+
+
+def plain_vcf(field, attacker, defender, depth):   # every four, whole board five checks
+    wins = []
+    for y in range(0, field.height):
+        for x in range(0, field.width):
+            if not field.piece(x, y) and plain_win_after(field, x, y, attacker, defender, depth):
+                wins.append((x, y))
+    return wins
+
+
+def plain_win_after(field, x, y, attacker, defender, depth):
+    field.place(attacker, x, y)
+    threats_made = fives(field, attacker)
+    won = len(threats_made) >= 2
+    if len(threats_made) == 1:
+        bx, by = threats_made[0]
+        field.place(defender, bx, by)
+        if not fives(field, defender) and depth > 1:
+            won = bool(plain_vcf(field, attacker, defender, depth - 1))
+        field.remove(bx, by)
+    field.remove(x, y)
+    return won
+
+
+def test_vcf_matches_plain_search():
+    rng = random.Random(12)
+    found = 0
+    for i in range(0, 60):
+        game = random_game(rng, 9, 9, rng.randint(6, 20))
+        if game.is_over():
+            continue
+        attacker, defender = game.turn, "O" if game.turn == "X" else "X"
+        wins = threats.vcf_moves(game, 3)
+        if fives(game.field, attacker) or fives(game.field, defender):
+            assert wins == []
+            continue
+        assert wins == plain_vcf(game.field, attacker, defender, 3)
+        found += bool(wins)
+    assert found
@@ -0,0 +1,48 @@
+import threading
+
+import transcript
+
+
+def record_session(path, answer):
+    recorder = transcript.Recorder(path)
+    recorder.record(transcript.SENT, 'ABOUT')
+    recorder.record(transcript.RECEIVED, answer)
+    recorder.record(transcript.SENT, 'END')
+    recorder.record(transcript.EXIT, '0')
+    recorder.close()
+
+
+def replay(path):
+    lines = []
+    done = threading.Event()
+    brain = transcript.Replayer(transcript.REPLAY_FAST + path, on_stdout=lines.append
+                                , on_shutdown=lambda code: done.set())
+    brain.send_message('ABOUT')
+    brain.shutdown()
+    assert done.wait(5)
+    return lines, brain.exit_code()
+
+
+def test_recorders_append_sessions(tmp_path):
+    path = str(tmp_path / 'brain.xot')
+    record_session(path, 'name="first"')
+    record_session(path, 'name="second"')
+
+    kinds = [kind for at, kind, text in transcript.read(path)]
+    assert kinds.count(transcript.SESSION) == 2
+    assert kinds[0] == transcript.SESSION
+
+    assert replay(path) == (['name="first"'], 0)
+    assert replay(path) == (['name="second"'], 0)
+
+
+def test_new_recorder_takes_the_file_over(tmp_path):
+    path = str(tmp_path / 'brain.xot')
+    old = transcript.Recorder(path)
+    new = transcript.Recorder(path)
+    old.record(transcript.SENT, 'lost')
+    new.record(transcript.SENT, 'kept')
+    new.close()
+
+    texts = [text for at, kind, text in transcript.read(path) if kind == transcript.SENT]
+    assert texts == ['kept']
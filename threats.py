@@ -0,0 +1,232 @@
+# Line threats for every empty square of a board at once, with NumPy.
+#
+# A 5-square window in one of the 4 directions is live for a side when it holds none of the
+# opponent's stones and does not run off the board. Playing an empty square raises the stone
+# count of every live window through it, so the level of a square in a direction follows
+# from how many live windows through it already hold 4, 3 or 2 of the side's stones:
+#
+#   5   a window with 4: the move makes five
+#   4d  two or more windows with 3: an open four, two squares to finish
+#   4s  one window with 3: a four with a single finishing square
+#   3d  two or more windows with 2: an open three, it becomes 4d if left alone
+#   3s  one window with 2: a closed three
+#
+# The counts are per window, so rare shapes like X.XXX.X can be rated one step off.
+import argparse
+
+import numpy
+
+from game import *
+
+
+EMPTY, X, O, WALL = 0, 1, 2, 3
+SIDES = {"X": X, "O": O}
+DIRECTIONS = ((1, 0), (0, 1), (1, 1), (1, -1))
+NONE, THREE, OPEN_THREE, FOUR, OPEN_FOUR, FIVE = range(0, 6)
+NAMES = ["", "3s", "3d", "4s", "4d", "5"]
+PAD = 5     # wider than a window, so windows shifted off the board always meet a wall
+
+
+def board_array(field):    # [y, x] of EMPTY, X, O inside a frame of WALL
+    board = numpy.full((field.height + 2 * PAD, field.width + 2 * PAD), WALL, numpy.int8)
+    inner = board[PAD:-PAD, PAD:-PAD]
+    inner[:] = EMPTY
+    stride = field.bit_stride()
+    size = field.height * stride
+    for side, value in SIDES.items():
+        bits = field.bits(side)
+        raw = numpy.frombuffer(bits.to_bytes((size + 7) // 8, 'little'), numpy.uint8)
+        squares = numpy.unpackbits(raw, bitorder='little')[0:size].reshape(field.height, stride)
+        inner[squares[:, 0:field.width] == 1] = value
+    return board
+
+
+def shift(array, dx, dy, k):     # result[y, x] = array[y + k * dy, x + k * dx]
+    return numpy.roll(array, (-k * dy, -k * dx), axis=(0, 1))
+
+
+class ThreatMap:
+    def __init__(self, side, levels):
+        self.side = side
+        self.levels = levels                # [direction, y, x]
+        self.best = levels.max(axis=0)      # [y, x]
+
+    def count(self, level):     # [y, x] number of directions at level or better
+        return (self.levels >= level).sum(axis=0)
+
+    def squares(self, level):   # [(x, y)] with a threat of at least level in some direction
+        ys, xs = numpy.nonzero(self.best >= level)
+        return [(int(x), int(y)) for x, y in zip(xs, ys)]
+
+    def double_threats(self):   # [(x, y)] making two fours, or a four and an open three
+        fours = self.count(FOUR)
+        threes = (self.levels == OPEN_THREE).sum(axis=0)
+        ys, xs = numpy.nonzero((fours >= 2) | ((fours >= 1) & (threes >= 1)))
+        return [(int(x), int(y)) for x, y in zip(xs, ys)]
+
+
+def scan_side(board, side):
+    mine = board == side
+    blocked = (board != EMPTY) & ~mine
+    empty = board == EMPTY
+    levels = []
+    for dx, dy in DIRECTIONS:
+        own = sum(shift(mine, dx, dy, k).astype(numpy.int8) for k in range(0, 5))
+        live = ~sum(shift(blocked, dx, dy, k) for k in range(0, 5)).astype(bool)
+        through = {}    # stones before the move -> live windows through each square
+        for stones in (4, 3, 2):
+            windows = (own == stones) & live
+            through[stones] = sum(shift(windows, dx, dy, -j).astype(numpy.int8) for j in range(0, 5))
+        level = numpy.select([through[4] > 0, through[3] >= 2, through[3] == 1, through[2] >= 2, through[2] == 1]
+                             , [FIVE, OPEN_FOUR, FOUR, OPEN_THREE, THREE], NONE).astype(numpy.int8)
+        level[~empty] = NONE
+        levels.append(level[PAD:-PAD, PAD:-PAD])
+    return numpy.stack(levels)
+
+
+def scan(field):    # side -> ThreatMap
+    board = board_array(field)
+    return {name: ThreatMap(name, scan_side(board, value)) for name, value in SIDES.items()}
+
+
+def forced_move(game):  # the move any engine has to find, or None when the position needs a search
+    if game.is_over():
+        return None
+    maps = scan(game.field)
+    own = maps[game.turn].squares(FIVE)
+    if own:
+        return own[0]
+    blocks = maps["O" if game.turn == "X" else "X"].squares(FIVE)
+    if len(blocks) == 1:
+        return blocks[0]
+    return None
+
+
+class Fours:     # exact five and four checks on a plain grid, for the continuous-four search
+    def __init__(self, field):
+        self.cells = board_array(field).tolist()    # [y][x], framed by PAD squares of WALL
+
+    def makes_five(self, x, y, side):   # x, y empty, in board coordinates
+        cells = self.cells
+        for dx, dy in DIRECTIONS:
+            count = 1
+            for sign in (1, -1):
+                cx, cy = x + PAD + sign * dx, y + PAD + sign * dy
+                while cells[cy][cx] == side:
+                    count += 1
+                    cx += sign * dx
+                    cy += sign * dy
+            if count >= 5:
+                return True
+        return False
+
+    def fives_through(self, x, y, side):    # empty squares on the lines through x, y that make five
+        cells = self.cells
+        found = []
+        for dx, dy in DIRECTIONS:
+            for k in range(-4, 5):
+                cx, cy = x + k * dx, y + k * dy
+                if k and cells[cy + PAD][cx + PAD] == EMPTY and self.makes_five(cx, cy, side) \
+                        and (cx, cy) not in found:
+                    found.append((cx, cy))
+        return found
+
+    def fives(self, side):
+        return [(x, y) for y in range(0, len(self.cells) - 2 * PAD) for x in range(0, len(self.cells[0]) - 2 * PAD)
+                if self.cells[y + PAD][x + PAD] == EMPTY and self.makes_five(x, y, side)]
+
+    def place(self, x, y, side):
+        self.cells[y + PAD][x + PAD] = side
+
+
+def vcf_moves(game, depth=12):  # first moves that win by continuous fours, [] when there is no such win
+    if game.is_over():
+        return []
+    attacker = SIDES[game.turn]
+    defender = X + O - attacker
+    board = Fours(game.field)
+    if board.fives(attacker) or board.fives(defender):
+        return []   # an immediate win or a forced block, see forced_move
+    lost = {}       # stones -> the most fours the attacker was allowed and still could not win with
+
+    def wins(stones, depth):
+        if depth == 0 or lost.get(stones, 0) >= depth:
+            return False
+        for x, y in fours(stones):
+            if win_after(x, y, stones, depth):
+                return True
+        lost[stones] = depth
+        return False
+
+    def fours(stones):
+        found = []
+        height, width = len(board.cells) - 2 * PAD, len(board.cells[0]) - 2 * PAD
+        for y in range(0, height):
+            for x in range(0, width):
+                if board.cells[y + PAD][x + PAD] != EMPTY:
+                    continue
+                board.place(x, y, attacker)
+                if board.fives_through(x, y, attacker):
+                    found.append((x, y))
+                board.place(x, y, EMPTY)
+        return found
+
+    def win_after(x, y, stones, depth):    # the attacker plays x, y, a four
+        board.place(x, y, attacker)
+        try:
+            threats = board.fives_through(x, y, attacker)
+            if len(threats) >= 2:
+                return True     # the defender has no five of its own and can block only one
+            bx, by = threats[0]
+            board.place(bx, by, defender)
+            try:
+                if board.fives_through(bx, by, defender):
+                    return False    # the block makes a four, the attacker would have to answer it
+                return wins(stones | {(x, y, attacker), (bx, by, defender)}, depth - 1)
+            finally:
+                board.place(bx, by, EMPTY)
+        finally:
+            board.place(x, y, EMPTY)
+
+    stones = frozenset()
+    return [(x, y) for x, y in fours(stones) if win_after(x, y, stones, depth)]
+
+
+def describe(game):
+    lines = []
+    for side, threat_map in scan(game.field).items():
+        for level in range(FIVE, THREE - 1, -1):
+            squares = [square for square in threat_map.squares(level) if threat_map.best[square[1], square[0]] == level]
+            if squares:
+                lines.append(side + ' ' + NAMES[level] + ': ' + ' '.join(str(x) + ',' + str(y) for x, y in squares))
+        doubles = threat_map.double_threats()
+        if doubles:
+            lines.append(side + ' double threats: ' + ' '.join(str(x) + ',' + str(y) for x, y in doubles))
+    wins = vcf_moves(game)
+    if wins:
+        lines.append(game.turn + ' wins by continuous fours from: ' + ' '.join(str(x) + ',' + str(y) for x, y in wins))
+    return lines
+
+
+def main():
+    from games_db import Games_DB
+
+    parser = argparse.ArgumentParser(description='Print the line threats of the final position of db games')
+    parser.add_argument('names', nargs='*', help='name prefixes, all games when empty')
+    parser.add_argument('--db', default='db')
+    args = parser.parse_args()
+
+    db = Games_DB(args.db)
+    for id, record in enumerate(db):
+        if args.names and not any(record["name"].startswith(name) for name in args.names):
+            continue
+        game = db.get(id)
+        if game is None:
+            continue
+        print(record["name"] + ' (' + str(game.turn) + ' to move)')
+        for line in describe(game):
+            print('    ' + line)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,183 @@
+#!/usr/bin/env python
+import argparse
+import itertools
+import json
+import multiprocessing
+import multiprocessing.util
+import time
+
+from config import Config
+from engine import EngineController, EngineCrashed, EngineTimeout, EnginePool
+from game import *
+from games_db import Games_DB
+
+
+_pool = None    # brains of this worker process kept running for its next games
+
+
+def worker_pool():
+    global _pool
+    if _pool is None:
+        _pool = EnginePool()
+        multiprocessing.util.Finalize(None, _pool.shutdown, exitpriority=10)    # runs when the worker exits
+    return _pool
+
+
+def play_game(task):
+    w, h = task["size"]
+    game = Game()
+    game.resize(w, h)
+    for x, y in task["opening_moves"]:
+        game.move(x, y)
+
+    record = {key: task[key] for key in ("round", "x", "o", "opening")}
+    engines = {}
+    start = time.perf_counter()
+    try:
+        for slot_id, side in enumerate(("X", "O")):
+            try:
+                engines[side] = start_engine(slot_id, task[side.lower()], task)
+            except (EngineCrashed, EngineTimeout):
+                return finish(record, game, start, "O" if side == "X" else "X", side + " failed to start")
+        while not game.is_over():
+            side = game.turn
+            opponent = "O" if side == "X" else "X"
+            try:
+                engines[side].think(game, use_cache=False)
+            except EngineCrashed:
+                return finish(record, game, start, opponent, side + " crashed")
+            except EngineTimeout:
+                return finish(record, game, start, opponent, side + " timed out")
+            except ValueError:
+                return finish(record, game, start, opponent, side + " sent garbage")
+            except (SquareOccupied, InvalidSquare):
+                return finish(record, game, start, opponent, side + " made an illegal move")
+        return finish(record, game, start, game.winner() or "draw", None)
+    finally:
+        record["incidents"] = {side: engine.incidents for side, engine in engines.items() if engine.incidents}
+        for side, engine in engines.items():
+            if not (record.get("reason") or '').startswith(side + ' '):
+                worker_pool().release(task[side.lower()], engine)
+            elif engine.ready():
+                engine.kill()   # lost by its own fault, it may still be thinking or confused
+
+
+def start_engine(slot_id, engine_id, task):
+    properties = dict(task["engines"][engine_id], need_local_copy=False)   # local copies would clash between workers
+    engine = worker_pool().acquire(engine_id, properties)
+    if engine is None:
+        engine = EngineController(slot_id)
+        engine.start(properties)
+    engine.set_slot_id(slot_id)
+    engine.set_reply_timeout(task["reply_timeout"])
+    engine.set_retries(task["retries"])
+    engine.incidents = []
+    if task["timeout_turn"]:
+        engine.send_info('timeout_turn', task["timeout_turn"])
+    return engine
+
+
+def finish(record, game, start, result, reason):
+    record["result"] = result
+    record["reason"] = reason
+    record["plies"] = game.moves.count()
+    record["moves"] = game.moves.string()
+    record["time"] = round(time.perf_counter() - start, 3)
+    return record
+
+
+def load_openings(dir, prefix, plies):
+    openings = []
+    db = Games_DB(dir)
+    for id, record in enumerate(db):
+        if record["name"].startswith(prefix):
+            game = db.get(id)
+            if game is None:    # unreadable, Games_DB already said so
+                continue
+            count = min(plies, game.moves.count())
+            opening = game.make_copy(count)
+            if not opening.is_over():
+                openings.append((record["name"], [(x, y) for x, y, side in opening.moves]))
+    return openings or [("empty", [])]
+
+
+def make_pairings(ids, mode):
+    if mode == "gauntlet":
+        return [(ids[0], other) for other in ids[1:]]
+    return list(itertools.combinations(ids, 2))
+
+
+def make_tasks(args, engines, openings):
+    tasks = []
+    for a, b in make_pairings(args.engines, args.mode):
+        for round in range(0, args.games):
+            name, opening = openings[round // 2 % len(openings)]
+            x, o = (a, b) if round % 2 == 0 else (b, a)
+            tasks.append({"round": round, "x": x, "o": o, "opening": name, "opening_moves": opening
+                          , "size": (args.size, args.size), "engines": engines
+                          , "timeout_turn": args.timeout_turn
+                          , "reply_timeout": args.reply_timeout, "retries": args.retries})
+    return tasks
+
+
+def summary(results, engines):
+    score = {id: [0, 0, 0] for id in engines}    # wins, draws, losses
+    for record in results:
+        if record["result"] == "draw":
+            score[record["x"]][1] += 1
+            score[record["o"]][1] += 1
+        else:
+            winner = record["x"] if record["result"] == "X" else record["o"]
+            loser = record["o"] if record["result"] == "X" else record["x"]
+            score[winner][0] += 1
+            score[loser][2] += 1
+    lines = []
+    for id, (wins, draws, losses) in sorted(score.items(), key=lambda item: -(item[1][0] * 2 + item[1][1])):
+        games = wins + draws + losses
+        if games:
+            lines.append('%-30s %4d games  +%d =%d -%d  %.1f%%'
+                         % (engines[id]["name"], games, wins, draws, losses, 100 * (wins + draws / 2) / games))
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Play engines from engines.cfg against each other without the GUI')
+    parser.add_argument('engines', type=int, nargs='+', help='engine ids from the engines config')
+    parser.add_argument('--config', default='engines.cfg')
+    parser.add_argument('--mode', choices=['round-robin', 'gauntlet'], default='round-robin'
+                        , help='gauntlet plays the first engine against every other one')
+    parser.add_argument('--games', type=int, default=2, help='games per pairing, colors alternate')
+    parser.add_argument('--workers', type=int, default=multiprocessing.cpu_count())
+    parser.add_argument('--size', type=int, default=16)
+    parser.add_argument('--db', default='db')
+    parser.add_argument('--openings', default='Test', help='db name prefix of the games used as openings')
+    parser.add_argument('--plies', type=int, default=4, help='plies taken from each opening game')
+    parser.add_argument('--timeout-turn', type=int, default=1000, help='INFO timeout_turn sent to engines, ms')
+    parser.add_argument('--reply-timeout', type=float, default=30, help='seconds before a silent engine loses')
+    parser.add_argument('--retries', type=int, default=1
+                        , help='restarts of a crashed or hung engine before it loses the game')
+    parser.add_argument('--output', default='tournament.jsonl')
+    args = parser.parse_args()
+
+    configs = Config.Engines(args.config)
+    engines = {id: dict(configs[id]) for id in args.engines}
+    openings = [(name, moves) for name, moves in load_openings(args.db, args.openings, args.plies)
+                if all(x < args.size and y < args.size for x, y in moves)] or [("empty", [])]
+    tasks = make_tasks(args, engines, openings)
+
+    results = []
+    with open(args.output, 'w') as output, multiprocessing.Pool(args.workers) as pool:
+        for record in pool.imap_unordered(play_game, tasks):
+            results.append(record)
+            output.write(json.dumps(record) + '\n')
+            output.flush()
+            print('%d/%d %s vs %s: %s%s' % (len(results), len(tasks), engines[record["x"]]["name"]
+                                          , engines[record["o"]]["name"], record["result"]
+                                          , ' (' + record["reason"] + ')' if record["reason"] else ''))
+        pool.close()
+        pool.join()     # lets the workers shut their brains down instead of being terminated
+    print(summary(results, engines))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,184 @@
+#!/usr/bin/env python
+# Engine transcripts: every message sent to a brain and every line it printed, with
+# monotonic timestamps, and a replayer that plays a brain back from one.
+#
+#   file   := MAGIC record*
+#   record := delta_us:u32 kind:u8 length:u32 text:utf8
+#
+# delta_us is the time since the previous record. All integers are little endian.
+# Records are written as they happen, so a transcript cut short by a crash is still readable.
+# Recorders append: each one starts with a SESSION record, and a controller gets its recorder
+# before it starts the brain, so every session begins with about.
+import argparse
+import queue
+import struct
+import threading
+import time
+
+
+MAGIC = b'XOT1'
+EXTENSION = '.xot'
+RECORD = struct.Struct('<IBI')
+SENT, RECEIVED, ERROR, EXIT, KILL, SESSION = range(0, 6)   # KILL: the controller killed the brain
+KIND_NAMES = ["<<<", ">>>", "err", "exit", "kill", "session"]
+REPLAY = 'replay:'              # engines.cfg path prefixes of the replayer
+REPLAY_FAST = 'replay-fast:'
+resume = {}     # transcript path -> first record of the next session, so a restarted brain goes on from there
+recorders = {}  # path -> the Recorder writing it, a newer one takes the file over
+
+
+class BadTranscript(BaseException):
+    ...
+
+
+class Recorder:
+    def __init__(self, path):
+        self.path = path
+        if path in recorders:
+            recorders[path].close()
+        recorders[path] = self
+        self.__file = open(path, 'ab')
+        if self.__file.tell() == 0:
+            self.__file.write(MAGIC)
+        self.__last = time.monotonic_ns()
+        self.__lock = threading.Lock()  # the brain reader thread records too
+        self.record(SESSION, time.strftime('%Y-%m-%d %H:%M:%S'))
+
+    def record(self, kind, text):
+        data = text.encode('utf-8')
+        with self.__lock:
+            if self.__file is None:
+                return
+            now = time.monotonic_ns()
+            delta = min((now - self.__last) // 1000, 0xFFFFFFFF)
+            self.__last = now
+            self.__file.write(RECORD.pack(delta, kind, len(data)) + data)
+            self.__file.flush()
+
+    def close(self):
+        with self.__lock:
+            if self.__file is not None:
+                self.__file.close()
+            self.__file = None
+        if recorders.get(self.path) is self:
+            del recorders[self.path]
+
+
+def read(path):     # yields seconds since the first record, kind, text
+    with open(path, 'rb') as file:
+        data = file.read()
+    if data[0:len(MAGIC)] != MAGIC:
+        raise BadTranscript
+    offset = len(MAGIC)
+    elapsed = 0
+    while offset + RECORD.size <= len(data):
+        delta, kind, length = RECORD.unpack_from(data, offset)
+        offset += RECORD.size
+        text = data[offset: offset + length].decode('utf-8')
+        offset += length
+        elapsed += delta
+        yield elapsed / 1000000, kind, text
+
+
+def is_replay(path):
+    return path.startswith(REPLAY) or path.startswith(REPLAY_FAST)
+
+
+class Replayer:     # the BrainDaemon.Brain interface, answering from a transcript
+    def __init__(self, path, on_stdout=None, on_stderr=None, on_shutdown=None):
+        self.fast = path.startswith(REPLAY_FAST)
+        self.__path = path[len(REPLAY_FAST if self.fast else REPLAY):]
+        self.__records = list(read(self.__path))
+        self.__next = resume.get(self.__path, 0)
+        if self.__next >= len(self.__records):
+            self.__next = 0
+        if self.__next < len(self.__records) and self.__records[self.__next][1] == SESSION:
+            self.__next += 1
+        if self.__next:     # timings of this session count from its own start
+            self.__records = self.__records[0:self.__next] + [
+                (at - self.__records[self.__next - 1][0], kind, text) for at, kind, text in self.__records[self.__next:]]
+        self.__on_stdout = on_stdout
+        self.__on_stderr = on_stderr
+        self.__on_shutdown = on_shutdown
+        self.__messages = queue.Queue()
+        self.__stop = threading.Event()
+        self.__exit_code = None
+        threading.Thread(target=self.__run, daemon=True).start()
+
+    def send_message(self, text):
+        self.__messages.put((time.monotonic(), text))
+
+    def exit_code(self):
+        return self.__exit_code
+
+    def shutdown(self):
+        self.send_message('END')
+
+    def kill(self):
+        self.__stop.set()
+        self.__messages.put(None)
+        self.__finish(-9)
+
+    def __finish(self, code, played=False):    # played: the recorded exit was just played
+        if self.__exit_code is None:
+            self.__exit_code = code
+            if played:
+                resume[self.__path] = self.__next
+            else:   # the session is cut short, the next one starts after its exit or at the next recording
+                ends = [i + (kind == EXIT) for i, (at, kind, text) in enumerate(self.__records)
+                        if i >= self.__next and kind in (EXIT, SESSION)]
+                resume[self.__path] = ends[0] if ends else len(self.__records)
+            if self.__on_shutdown:
+                self.__on_shutdown(code)
+
+    def __play_until_sent(self, start, recorded_start):
+        # the brain's lines up to the next message sent to it, at their recorded distance from start
+        while self.__next < len(self.__records) and not self.__stop.is_set():
+            at, kind, text = self.__records[self.__next]
+            if kind in (SENT, KILL, SESSION):   # up to the controller, or the recording ended
+                return
+            self.__next += 1
+            if not self.fast:
+                delay = start + (at - recorded_start) - time.monotonic()
+                if delay > 0 and self.__stop.wait(delay):
+                    return
+            if kind == RECEIVED and self.__on_stdout:
+                self.__on_stdout(text)
+            elif kind == ERROR and self.__on_stderr:
+                self.__on_stderr(text)
+            elif kind == EXIT:
+                self.__finish(int(text), played=True)
+                return
+
+    def __run(self):
+        self.__play_until_sent(time.monotonic(), 0)
+        while not self.__stop.is_set() and self.__exit_code is None:
+            item = self.__messages.get()
+            if item is None:
+                return
+            sent_at, text = item
+            if self.__next >= len(self.__records) or self.__records[self.__next][1] == SESSION:
+                self.__finish(0)    # the recorded session ends here
+                return
+            at, kind, expected = self.__records[self.__next]
+            if text != expected:
+                if self.__on_stdout:
+                    self.__on_stdout('ERROR replay expected ' + expected.replace('\n', ' | '))
+                continue
+            self.__next += 1
+            self.__play_until_sent(sent_at, at)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Print an engine transcript')
+    parser.add_argument('path')
+    args = parser.parse_args()
+
+    previous = 0
+    for at, kind, text in read(args.path):
+        print('%10.3f %+9.3f %-4s %s' % (at, at - previous, KIND_NAMES[kind], text.replace('\n', ' | ')))
+        previous = at
+
+
+if __name__ == '__main__':
+    main()